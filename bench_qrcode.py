@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the consolidated qrcode.py.
+
+Copyright (c) 2025 c4ffein
+Licensed under the MIT License - see LICENSE file for details
+"""
+import sys
+import timeit
+
+# Import the consolidated qrcode module
+import qrcode
+
+# Byte capacity of a version 40-L code
+MAX_BYTES = 2953
+
+def best_time(func, number):
+    """Return the best time per call of func, in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def bench_segmentation():
+    """Time optimal_data_chunks on payloads with many short numeric runs, up to 2953 bytes."""
+    print('Segmentation (optimal_data_chunks, minimum=4):')
+    pattern = b'id=12345&x=ab-'
+    for size in (MAX_BYTES // 8, MAX_BYTES // 4, MAX_BYTES // 2, MAX_BYTES):
+        data = (pattern * (size // len(pattern) + 1))[:size]
+        elapsed = best_time(lambda: list(qrcode.util.optimal_data_chunks(data, minimum=4)), 20)
+        print(f'  {size:5d} bytes: {elapsed:9.1f} us ({elapsed / size * 1000:6.1f} ns/byte)')
+
+BENCHMARKS = {
+    'segmentation': bench_segmentation,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        BENCHMARKS[name]()
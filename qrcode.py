@@ -63,21 +63,38 @@ from (http://code.google.com/p/pyqrnative):
 from __future__ import annotations
 
 import abc
+import asyncio
 import datetime
 import decimal
+import functools
+import hashlib
+import io
 import math
 import optparse
 import os
 import re
+import struct
 import sys
+import threading
+import time
 import warnings
+import weakref
 import xml.etree.ElementTree
+import zlib
 
+from array import array
 from bisect import bisect_left
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
 from decimal import Decimal
 from importlib import metadata
 from importlib.util import find_spec
 from itertools import chain
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
 from typing import Any
 from typing import Generic
@@ -97,6 +114,10 @@ try:
 except ImportError:
     Image = None
     ImageDraw = None
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
 
 # Patch metadata.version to handle missing package metadata
 _original_metadata_version = metadata.version
@@ -127,7 +148,10 @@ qrcode.image.pure = _ModuleNamespace()
 qrcode.LUT = _ModuleNamespace()
 qrcode.base = _ModuleNamespace()
 qrcode.util = _ModuleNamespace()
+qrcode.numpy_engine = _ModuleNamespace()
 qrcode.main = _ModuleNamespace()
+qrcode.cache = _ModuleNamespace()
+qrcode.parallel = _ModuleNamespace()
 qrcode.console_scripts = _ModuleNamespace()
 qrcode.__main__ = _ModuleNamespace()
 qrcode.compat.etree = _ModuleNamespace()
@@ -145,7 +169,9 @@ exceptions = qrcode.exceptions
 LUT = qrcode.LUT
 base = qrcode.base
 util = qrcode.util
+numpy_engine = qrcode.numpy_engine
 main = qrcode.main
+parallel = qrcode.parallel
 console_scripts = qrcode.console_scripts
 compat = qrcode.compat
 release = qrcode.release
@@ -161,6 +187,7 @@ ERROR_CORRECT_M = 0
 ERROR_CORRECT_Q = 3
 ERROR_CORRECT_H = 2
 PIL_AVAILABLE = find_spec('PIL') is not None
+NUMPY_AVAILABLE = find_spec('numpy') is not None
 
 # Populate namespace for qrcode.constants
 qrcode.constants.ERROR_CORRECT_L = ERROR_CORRECT_L
@@ -168,6 +195,7 @@ qrcode.constants.ERROR_CORRECT_M = ERROR_CORRECT_M
 qrcode.constants.ERROR_CORRECT_Q = ERROR_CORRECT_Q
 qrcode.constants.ERROR_CORRECT_H = ERROR_CORRECT_H
 qrcode.constants.PIL_AVAILABLE = PIL_AVAILABLE
+qrcode.constants.NUMPY_AVAILABLE = NUMPY_AVAILABLE
 
 # ============================================================
 # Module: qrcode.image
@@ -244,10 +272,27 @@ class BaseImage(abc.ABC):
         self.width = width
         self.box_size = box_size
         self.pixel_size = (self.width + self.border * 2) * self.box_size
-        self.modules = kwargs.pop('qrcode_modules')
+        self._modules = kwargs.pop('qrcode_modules', None)
+        self.matrix = kwargs.pop('qrcode_matrix', None)
+        if self.matrix is None:
+            self.matrix = util.BitMatrix.from_list(self._modules)
         self._img = self.new_image(**kwargs)
         self.init_new_image()
 
+    @property
+    def modules(self):
+        """
+        The modules as a list of lists, built from ``matrix`` on first access
+        if the QR Code did not pass them.
+        """
+        if self._modules is None:
+            self._modules = self.matrix.to_list()
+        return self._modules
+
+    @modules.setter
+    def modules(self, value):
+        self._modules = value
+
     @abc.abstractmethod
     def drawrect(self, row, col):
         """
@@ -260,6 +305,14 @@ class BaseImage(abc.ABC):
         """
         raise NotImplementedError('BaseImage.drawrect_context')
 
+    def drawmatrix(self, matrix) -> bool:
+        """
+        Draw all the dark modules of a ``util.BitMatrix`` at once, returning
+        ``False`` if the image has to be drawn module by module with
+        ``drawrect`` instead.
+        """
+        return False
+
     def process(self):
         """
         Processes QR code after completion
@@ -397,6 +450,21 @@ class PilImage(qrcode.image.base.BaseImage):
         box = self.pixel_box(row, col)
         self._idr.rectangle(box, fill=self.fill_color)
 
+    def drawmatrix(self, matrix):
+        """
+        Draw the modules as a one pixel per module 1-bit mask, scaled up to
+        the box size, through which the fill color is pasted. Subclasses
+        overriding ``drawrect`` are drawn module by module.
+        """
+        if type(self).drawrect is not PilImage.drawrect:
+            return False
+        mask = Image.frombytes('1', (matrix.size, matrix.size), matrix.to_bytes())
+        size = matrix.size * self.box_size
+        mask = mask.resize((size, size), Image.NEAREST)
+        offset = self.border * self.box_size
+        self._img.paste(self.fill_color, (offset, offset), mask)
+        return True
+
     def save(self, stream, format=None, **kwargs):
         kind = kwargs.pop('kind', self.kind)
         if format is None:
@@ -431,6 +499,10 @@ qrcode.compat.png.PngWriter = PngWriter
 class PyPNGImage(BaseImage):
     """
     pyPNG image builder.
+
+    With ``packed=True`` (the default), ``save`` hands PyPNG the scanlines of
+    ``packed_rows_iter``, already packed 8 pixels per byte; with
+    ``packed=False`` it writes the lists of ints of ``rows_iter``.
     """
     kind = 'PNG'
     allowed_kinds = ('PNG',)
@@ -439,8 +511,14 @@ class PyPNGImage(BaseImage):
     def new_image(self, **kwargs):
         if not PngWriter:
             raise ImportError('PyPNG library not installed.')
+        self.packed = kwargs.get('packed', True)
         return PngWriter(self.pixel_size, self.pixel_size, greyscale=True, bitdepth=1)
 
+    def init_new_image(self):
+        self._scale_table = str.maketrans({'0': '1' * self.box_size, '1': '0' * self.box_size})
+        self._border_bits = '1' * (self.border * self.box_size)
+        self._border_row = None
+
     def drawrect(self, row, col):
         """
         Not used.
@@ -449,7 +527,10 @@ class PyPNGImage(BaseImage):
     def save(self, stream, kind=None):
         if isinstance(stream, str):
             stream = Path(stream).open('wb')
-        self._img.write(stream, self.rows_iter())
+        if self.packed:
+            self._img.write_packed(stream, self.packed_rows_iter())
+        else:
+            self._img.write(stream, self.rows_iter())
 
     def rows_iter(self):
         yield from self.border_rows_iter()
@@ -461,14 +542,105 @@ class PyPNGImage(BaseImage):
         yield from self.border_rows_iter()
 
     def border_rows_iter(self):
-        border_row = [1] * (self.box_size * (self.width + self.border * 2))
+        if self._border_row is None:
+            self._border_row = [1] * (self.box_size * (self.width + self.border * 2))
+        for _ in range(self.border * self.box_size):
+            yield self._border_row
+
+    def packed_rows_iter(self):
+        """
+        Yield the packed scanlines, each distinct one being built once.
+        """
+        blank = self.pack_scanline(0)
+        for _ in range(self.border * self.box_size):
+            yield blank
+        scanlines: dict[int, bytes] = {}
+        for bits in self.matrix.dark:
+            scanline = scanlines.get(bits)
+            if scanline is None:
+                scanline = scanlines[bits] = self.pack_scanline(bits)
+            for _ in range(self.box_size):
+                yield scanline
         for _ in range(self.border * self.box_size):
-            yield border_row
+            yield blank
+
+    def pack_scanline(self, bits):
+        """
+        Return the scanline of a module row: each module scaled to the box
+        size, framed by the border and padded to whole bytes.
+        """
+        text = self._border_bits + format(bits, f'0{self.width}b').translate(self._scale_table) + self._border_bits
+        text += '0' * (-len(text) % 8)
+        return int(text, 2).to_bytes(len(text) // 8, 'big')
 PymagingImage = PyPNGImage
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_IDAT_SIZE = 65536
+
+class PurePngWriter:
+    """
+    Minimal 1-bit greyscale PNG encoder using only ``zlib`` and ``struct``.
+    """
+
+    def __init__(self, width, height, compress_level=6):
+        self.width = width
+        self.height = height
+        self.compress_level = compress_level
+
+    def write_packed(self, stream, rows):
+        """
+        Write the PNG of ``rows`` to ``stream``, each row being a scanline
+        packed 8 pixels per byte (1 is white). Compressed data is written as
+        it comes, in IDAT chunks of about ``PNG_IDAT_SIZE`` bytes.
+        """
+        stream.write(PNG_SIGNATURE)
+        self.write_chunk(stream, b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 1, 0, 0, 0, 0))
+        compressor = zlib.compressobj(self.compress_level)
+        pending: list[bytes] = []
+        pending_size = 0
+        for row in rows:
+            for data in (compressor.compress(b'\x00'), compressor.compress(row)):
+                if data:
+                    pending.append(data)
+                    pending_size += len(data)
+            if pending_size >= PNG_IDAT_SIZE:
+                self.write_chunk(stream, b'IDAT', b''.join(pending))
+                pending = []
+                pending_size = 0
+        pending.append(compressor.flush())
+        self.write_chunk(stream, b'IDAT', b''.join(pending))
+        self.write_chunk(stream, b'IEND', b'')
+
+    @staticmethod
+    def write_chunk(stream, chunk_type, data):
+        stream.write(struct.pack('>I', len(data)) + chunk_type)
+        stream.write(data)
+        stream.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(chunk_type))))
+
+class PurePNGImage(PyPNGImage):
+    """
+    Dependency-free PNG image builder, writing 1-bit greyscale PNGs.
+
+    The ``compress_level`` keyword sets the zlib compression level.
+    """
+    packed = True
+
+    def new_image(self, **kwargs):
+        return PurePngWriter(self.pixel_size, self.pixel_size, kwargs.get('compress_level', 6))
+
+    def save(self, stream, kind=None):
+        if isinstance(stream, str):
+            with Path(stream).open('wb') as file:
+                self._img.write_packed(file, self.packed_rows_iter())
+            return
+        self._img.write_packed(stream, self.packed_rows_iter())
 
 # Populate namespace for qrcode.image.pure
 qrcode.image.pure.PyPNGImage = PyPNGImage
 qrcode.image.pure.PymagingImage = PymagingImage
+qrcode.image.pure.PNG_SIGNATURE = PNG_SIGNATURE
+qrcode.image.pure.PNG_IDAT_SIZE = PNG_IDAT_SIZE
+qrcode.image.pure.PurePngWriter = PurePngWriter
+qrcode.image.pure.PurePNGImage = PurePNGImage
 
 # ============================================================
 # Module: qrcode.LUT
@@ -493,6 +665,9 @@ for i in range(8, 256):
     EXP_TABLE[i] = EXP_TABLE[i - 4] ^ EXP_TABLE[i - 5] ^ EXP_TABLE[i - 6] ^ EXP_TABLE[i - 8]
 for i in range(255):
     LOG_TABLE[EXP_TABLE[i]] = i
+GF_EXP_TABLE = EXP_TABLE[:255] * 2
+GF_LOG_INDEX = bytes([255]) + bytes(LOG_TABLE[1:])
+GF_MUL_TABLE = (bytes(256),) + tuple((GF_LOG_INDEX.translate(bytes(GF_EXP_TABLE[LOG_TABLE[n]:LOG_TABLE[n] + 255]) + bytes(1)) for n in range(1, 256)))
 RS_BLOCK_OFFSET = {constants.ERROR_CORRECT_L: 0, constants.ERROR_CORRECT_M: 1, constants.ERROR_CORRECT_Q: 2, constants.ERROR_CORRECT_H: 3}
 RS_BLOCK_TABLE = ((1, 26, 19), (1, 26, 16), (1, 26, 13), (1, 26, 9), (1, 44, 34), (1, 44, 28), (1, 44, 22), (1, 44, 16), (1, 70, 55), (1, 70, 44), (2, 35, 17), (2, 35, 13), (1, 100, 80), (2, 50, 32), (2, 50, 24), (4, 25, 9), (1, 134, 108), (2, 67, 43), (2, 33, 15, 2, 34, 16), (2, 33, 11, 2, 34, 12), (2, 86, 68), (4, 43, 27), (4, 43, 19), (4, 43, 15), (2, 98, 78), (4, 49, 31), (2, 32, 14, 4, 33, 15), (4, 39, 13, 1, 40, 14), (2, 121, 97), (2, 60, 38, 2, 61, 39), (4, 40, 18, 2, 41, 19), (4, 40, 14, 2, 41, 15), (2, 146, 116), (3, 58, 36, 2, 59, 37), (4, 36, 16, 4, 37, 17), (4, 36, 12, 4, 37, 13), (2, 86, 68, 2, 87, 69), (4, 69, 43, 1, 70, 44), (6, 43, 19, 2, 44, 20), (6, 43, 15, 2, 44, 16), (4, 101, 81), (1, 80, 50, 4, 81, 51), (4, 50, 22, 4, 51, 23), (3, 36, 12, 8, 37, 13), (2, 116, 92, 2, 117, 93), (6, 58, 36, 2, 59, 37), (4, 46, 20, 6, 47, 21), (7, 42, 14, 4, 43, 15), (4, 133, 107), (8, 59, 37, 1, 60, 38), (8, 44, 20, 4, 45, 21), (12, 33, 11, 4, 34, 12), (3, 145, 115, 1, 146, 116), (4, 64, 40, 5, 65, 41), (11, 36, 16, 5, 37, 17), (11, 36, 12, 5, 37, 13), (5, 109, 87, 1, 110, 88), (5, 65, 41, 5, 66, 42), (5, 54, 24, 7, 55, 25), (11, 36, 12, 7, 37, 13), (5, 122, 98, 1, 123, 99), (7, 73, 45, 3, 74, 46), (15, 43, 19, 2, 44, 20), (3, 45, 15, 13, 46, 16), (1, 135, 107, 5, 136, 108), (10, 74, 46, 1, 75, 47), (1, 50, 22, 15, 51, 23), (2, 42, 14, 17, 43, 15), (5, 150, 120, 1, 151, 121), (9, 69, 43, 4, 70, 44), (17, 50, 22, 1, 51, 23), (2, 42, 14, 19, 43, 15), (3, 141, 113, 4, 142, 114), (3, 70, 44, 11, 71, 45), (17, 47, 21, 4, 48, 22), (9, 39, 13, 16, 40, 14), (3, 135, 107, 5, 136, 108), (3, 67, 41, 13, 68, 42), (15, 54, 24, 5, 55, 25), (15, 43, 15, 10, 44, 16), (4, 144, 116, 4, 145, 117), (17, 68, 42), (17, 50, 22, 6, 51, 23), (19, 46, 16, 6, 47, 17), (2, 139, 111, 7, 140, 112), (17, 74, 46), (7, 54, 24, 16, 55, 25), (34, 37, 13), (4, 151, 121, 5, 152, 122), (4, 75, 47, 14, 76, 48), (11, 54, 24, 14, 55, 25), (16, 45, 15, 14, 46, 16), (6, 147, 117, 4, 148, 118), (6, 73, 45, 14, 74, 46), (11, 54, 24, 16, 55, 25), (30, 46, 16, 2, 47, 17), (8, 132, 106, 4, 133, 107), (8, 75, 47, 13, 76, 48), (7, 54, 24, 22, 55, 25), (22, 45, 15, 13, 46, 16), (10, 142, 114, 2, 143, 115), (19, 74, 46, 4, 75, 47), (28, 50, 22, 6, 51, 23), (33, 46, 16, 4, 47, 17), (8, 152, 122, 4, 153, 123), (22, 73, 45, 3, 74, 46), (8, 53, 23, 26, 54, 24), (12, 45, 15, 28, 46, 16), (3, 147, 117, 10, 148, 118), (3, 73, 45, 23, 74, 46), (4, 54, 24, 31, 55, 25), (11, 45, 15, 31, 46, 16), (7, 146, 116, 7, 147, 117), (21, 73, 45, 7, 74, 46), (1, 53, 23, 37, 54, 24), (19, 45, 15, 26, 46, 16), (5, 145, 115, 10, 146, 116), (19, 75, 47, 10, 76, 48), (15, 54, 24, 25, 55, 25), (23, 45, 15, 25, 46, 16), (13, 145, 115, 3, 146, 116), (2, 74, 46, 29, 75, 47), (42, 54, 24, 1, 55, 25), (23, 45, 15, 28, 46, 16), (17, 145, 115), (10, 74, 46, 23, 75, 47), (10, 54, 24, 35, 55, 25), (19, 45, 15, 35, 46, 16), (17, 145, 115, 1, 146, 116), (14, 74, 46, 21, 75, 47), (29, 54, 24, 19, 55, 25), (11, 45, 15, 46, 46, 16), (13, 145, 115, 6, 146, 116), (14, 74, 46, 23, 75, 47), (44, 54, 24, 7, 55, 25), (59, 46, 16, 1, 47, 17), (12, 151, 121, 7, 152, 122), (12, 75, 47, 26, 76, 48), (39, 54, 24, 14, 55, 25), (22, 45, 15, 41, 46, 16), (6, 151, 121, 14, 152, 122), (6, 75, 47, 34, 76, 48), (46, 54, 24, 10, 55, 25), (2, 45, 15, 64, 46, 16), (17, 152, 122, 4, 153, 123), (29, 74, 46, 14, 75, 47), (49, 54, 24, 10, 55, 25), (24, 45, 15, 46, 46, 16), (4, 152, 122, 18, 153, 123), (13, 74, 46, 32, 75, 47), (48, 54, 24, 14, 55, 25), (42, 45, 15, 32, 46, 16), (20, 147, 117, 4, 148, 118), (40, 75, 47, 7, 76, 48), (43, 54, 24, 22, 55, 25), (10, 45, 15, 67, 46, 16), (19, 148, 118, 6, 149, 119), (18, 75, 47, 31, 76, 48), (34, 54, 24, 34, 55, 25), (20, 45, 15, 61, 46, 16))
 
@@ -504,6 +679,18 @@ def glog(n):
 def gexp(n):
     return EXP_TABLE[n % 255]
 
+def gf_mul_row(row, factor):
+    """
+    Multiply every coefficient of a codeword row by ``factor`` in GF(256).
+    """
+    return bytes(row).translate(GF_MUL_TABLE[factor])
+
+def gf_xor_rows(row, other):
+    """
+    Add (XOR) two codeword rows of the same length in GF(256).
+    """
+    return (int.from_bytes(row, 'big') ^ int.from_bytes(other, 'big')).to_bytes(len(row), 'big')
+
 class Polynomial:
 
     def __init__(self, num, shift):
@@ -525,22 +712,45 @@ class Polynomial:
         return len(self.num)
 
     def __mul__(self, other):
-        num = [0] * (len(self) + len(other) - 1)
+        num = bytearray(len(self) + len(other) - 1)
+        other_row = bytes(other)
         for i, item in enumerate(self):
-            for j, other_item in enumerate(other):
-                num[i + j] ^= gexp(glog(item) + glog(other_item))
-        return Polynomial(num, 0)
+            end = i + len(other_row)
+            num[i:end] = gf_xor_rows(num[i:end], gf_mul_row(other_row, item))
+        return Polynomial(list(num), 0)
 
     def __mod__(self, other):
         difference = len(self) - len(other)
         if difference < 0:
             return self
         ratio = glog(self[0]) - glog(other[0])
-        num = [item ^ gexp(glog(other_item) + ratio) for item, other_item in zip(self, other)]
+        num = list(gf_xor_rows(self[:len(other)], gf_mul_row(other, gexp(ratio))))
         if difference:
             num.extend(self[-difference:])
         return Polynomial(num, 0) % other
 
+def rs_encode(data, generator):
+    """
+    Return the Reed-Solomon error correction codewords for ``data``.
+
+    ``generator`` holds the generator polynomial coefficients, leading term
+    included. The remainder is computed in place in a single preallocated
+    buffer, one multiplied generator row at a time, instead of recursing
+    through ``Polynomial.__mod__``, which is kept as the reference
+    implementation.
+    """
+    data_count = len(data)
+    ec_count = len(generator) - 1
+    generator_row = bytes(generator[1:])
+    buffer = bytearray(data)
+    buffer.extend(bytes(ec_count))
+    for i in range(data_count):
+        coef = buffer[i]
+        if coef:
+            start, end = (i + 1, i + 1 + ec_count)
+            buffer[start:end] = gf_xor_rows(buffer[start:end], gf_mul_row(generator_row, coef))
+    return buffer[data_count:]
+
 class RSBlock(NamedTuple):
     total_count: int
     data_count: int
@@ -560,11 +770,17 @@ def rs_blocks(version, error_correction):
 # Populate namespace for qrcode.base
 qrcode.base.EXP_TABLE = EXP_TABLE
 qrcode.base.LOG_TABLE = LOG_TABLE
+qrcode.base.GF_EXP_TABLE = GF_EXP_TABLE
+qrcode.base.GF_LOG_INDEX = GF_LOG_INDEX
+qrcode.base.GF_MUL_TABLE = GF_MUL_TABLE
 qrcode.base.RS_BLOCK_OFFSET = RS_BLOCK_OFFSET
 qrcode.base.RS_BLOCK_TABLE = RS_BLOCK_TABLE
 qrcode.base.glog = glog
 qrcode.base.gexp = gexp
+qrcode.base.gf_mul_row = gf_mul_row
+qrcode.base.gf_xor_rows = gf_xor_rows
 qrcode.base.Polynomial = Polynomial
+qrcode.base.rs_encode = rs_encode
 qrcode.base.RSBlock = RSBlock
 qrcode.base.rs_blocks = rs_blocks
 
@@ -589,10 +805,79 @@ G18 = 1 << 12 | 1 << 11 | 1 << 10 | 1 << 9 | 1 << 8 | 1 << 5 | 1 << 2 | 1 << 0
 G15_MASK = 1 << 14 | 1 << 12 | 1 << 10 | 1 << 4 | 1 << 1
 PAD0 = 236
 PAD1 = 17
+PACK_BITS = bytes.maketrans(b'\x00\x01', b'01')
+UNPACK_BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+class LRUCache:
+    """
+    Process-wide bounded cache evicting the least recently used entries.
+
+    Lookups and evictions are counted so callers can report cache
+    efficiency, see ``info()``. ``maxsize=None`` disables the bound.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._trim()
+
+    def resize(self, maxsize):
+        """
+        Change the bound, evicting entries right away if needed.
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            self._trim()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'size': len(self._data), 'maxsize': self.maxsize}
+
+    def _trim(self):
+        if self.maxsize is None:
+            return
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
 
 def _data_count(block):
     return block.data_count
 BIT_LIMIT_TABLE = [[0] + [8 * sum(map(_data_count, base.rs_blocks(version, error_correction))) for version in range(1, 41)] for error_correction in range(4)]
+RS_GENERATOR_LUT = {ec_count: bytes(poly) for ec_count, poly in LUT.rsPoly_LUT.items()}
+RS_GENERATOR_CACHE_SIZE = 32
+MASK_SAMPLE_STEP = 4
+PREWARM_ON_IMPORT = os.environ.get('QRCODE_PREWARM', '').strip().lower() not in ('', '0', 'false', 'no', 'off')
+rs_generator_cache = LRUCache(RS_GENERATOR_CACHE_SIZE)
 
 def BCH_type_info(data):
     d = data << 10
@@ -612,6 +897,79 @@ def BCH_digit(data):
         digit += 1
         data >>= 1
     return digit
+TYPE_INFO_TABLE = tuple((BCH_type_info(data) for data in range(32)))
+TYPE_NUMBER_TABLE = {version: BCH_type_number(version) for version in range(7, 41)}
+
+def type_info_coords(size):
+    """
+    Return, for each of the 15 format information bits, the two modules
+    holding it, followed by the always dark module as a 16th bit.
+    """
+    coords = []
+    for i in range(15):
+        if i < 6:
+            vertical = (i, 8)
+        elif i < 8:
+            vertical = (i + 1, 8)
+        else:
+            vertical = (size - 15 + i, 8)
+        if i < 8:
+            horizontal = (8, size - i - 1)
+        elif i < 9:
+            horizontal = (8, 15 - i - 1 + 1)
+        else:
+            horizontal = (8, 15 - i - 1)
+        coords.append((vertical, horizontal))
+    coords.append(((size - 8, 8),))
+    return tuple(coords)
+
+def type_number_coords(size):
+    """
+    Return, for each of the 18 version information bits, the two modules
+    holding it.
+    """
+    return tuple((((i // 3, i % 3 + size - 8 - 3), (i % 3 + size - 8 - 3, i // 3)) for i in range(18)))
+TYPE_INFO_COORDS = {version * 4 + 17: type_info_coords(version * 4 + 17) for version in range(1, 41)}
+TYPE_NUMBER_COORDS = {version * 4 + 17: type_number_coords(version * 4 + 17) for version in range(7, 41)}
+type_rows_cache: dict[tuple[int, int, int], tuple[tuple[int, int, int], ...]] = {}
+
+def coords_rows(coords, bits, size):
+    """
+    Return the ``(row, area, dark)`` bulk update writing ``bits`` to the
+    modules ``coords[i]`` of each bit ``i``: ``area`` flags the modules of
+    the row that are written and ``dark`` the dark ones.
+    """
+    area: dict[int, int] = {}
+    dark: dict[int, int] = {}
+    for i, modules in enumerate(coords):
+        for row, col in modules:
+            module = 1 << size - 1 - col
+            area[row] = area.get(row, 0) | module
+            if bits >> i & 1:
+                dark[row] = dark.get(row, 0) | module
+    return tuple(((row, area[row], dark.get(row, 0)) for row in sorted(area)))
+
+def type_info_rows(size, bits):
+    """
+    Return the cached ``coords_rows`` update writing the format information
+    ``bits`` (with the always dark module as bit 15).
+    """
+    key = (15, size, bits)
+    rows = type_rows_cache.get(key)
+    if rows is None:
+        rows = type_rows_cache[key] = coords_rows(TYPE_INFO_COORDS[size], bits, size)
+    return rows
+
+def type_number_rows(size, bits):
+    """
+    Return the cached ``coords_rows`` update writing the version
+    information ``bits``.
+    """
+    key = (18, size, bits)
+    rows = type_rows_cache.get(key)
+    if rows is None:
+        rows = type_rows_cache[key] = coords_rows(TYPE_NUMBER_COORDS[size], bits, size)
+    return rows
 
 def pattern_position(version):
     return PATTERN_POSITION_TABLE[version - 1]
@@ -629,7 +987,7 @@ def mask_func(pattern):
     if pattern == 3:
         return lambda i, j: (i + j) % 3 == 0
     if pattern == 4:
-        return lambda i, j: (math.floor(i / 2) + math.floor(j / 3)) % 2 == 0
+        return lambda i, j: (i // 2 + j // 3) % 2 == 0
     if pattern == 5:
         return lambda i, j: i * j % 2 + i * j % 3 == 0
     if pattern == 6:
@@ -638,6 +996,51 @@ def mask_func(pattern):
         return lambda i, j: (i * j % 3 + (i + j) % 2) % 2 == 0
     raise TypeError('Bad mask pattern: ' + pattern)
 
+def mask_rows(pattern, size):
+    """
+    Return the given mask pattern over a ``size`` wide square, as one packed
+    row per module row (see ``pack_row``).
+
+    All mask patterns repeat every 12 rows and every 6 columns, so only a 12
+    by 6 tile goes through the mask function.
+    """
+    func = mask_func(pattern)
+    tile = []
+    for i in range(12):
+        unit = ''.join(('1' if func(i, j) else '0' for j in range(6)))
+        tile.append(int((unit * (size // 6 + 1))[:size], 2))
+    return tuple((tile[i % 12] for i in range(size)))
+
+def pack_row(row):
+    """
+    Pack a row of modules into an int, the first module being the most
+    significant bit.
+    """
+    return int(bytes(map(bool, row)).translate(PACK_BITS) or b'0', 2)
+
+def unpack_row(bits, size):
+    """
+    Unpack an int built by ``pack_row`` back into a list of ``size`` bools.
+    """
+    return list(map(bool, format(bits, f'0{size}b').encode('ascii').translate(UNPACK_BITS)))
+
+def pack_rows(rows, size):
+    """
+    Pack rows built by ``pack_row`` into bytes, each row padded to whole
+    bytes.
+    """
+    padding = -size % 8
+    width = (size + padding) // 8
+    return b''.join(((bits << padding).to_bytes(width, 'big') for bits in rows))
+
+def unpack_rows(data, size):
+    """
+    Unpack bytes built by ``pack_rows`` back into ``size`` rows.
+    """
+    padding = -size % 8
+    width = (size + padding) // 8
+    return [int.from_bytes(data[offset:offset + width], 'big') >> padding for offset in range(0, size * width, width)]
+
 def mode_sizes_for_version(version):
     if version < 10:
         return MODE_SIZE_SMALL
@@ -656,6 +1059,8 @@ def check_version(version):
         raise ValueError(f'Invalid version (was {version}, expected 1 to 40)')
 
 def lost_point(modules):
+    if isinstance(modules, BitMatrix):
+        return lost_point_bits(modules)
     modules_count = len(modules)
     lost_point = 0
     lost_point = _lost_point_level1(modules, modules_count)
@@ -744,6 +1149,70 @@ def _lost_point_level4(modules, modules_count):
     rating = int(abs(percent * 100 - 50) / 5)
     return rating * 10
 
+def lost_point_bits(matrix):
+    """
+    Compute the same penalty score as ``lost_point`` on a ``BitMatrix``,
+    handling whole rows and columns as bitsets.
+    """
+    rows = matrix.dark
+    columns = matrix.columns()
+    full = (1 << matrix.size) - 1
+    lost_point = _lost_point_bits_level1(rows, full)
+    lost_point += _lost_point_bits_level1(columns, full)
+    lost_point += _lost_point_bits_level2(rows, full)
+    lost_point += _lost_point_bits_level3(rows, full)
+    lost_point += _lost_point_bits_level3(columns, full)
+    lost_point += _lost_point_bits_level4(rows, matrix.size)
+    return lost_point
+
+def lost_point_sampled(matrix, step=MASK_SAMPLE_STEP):
+    """
+    Estimate ``lost_point_bits`` from every ``step``-th row, column and pair
+    of rows, scaled back to the whole matrix. The dark ratio penalty is
+    computed on all the modules.
+    """
+    rows = matrix.dark
+    full = (1 << matrix.size) - 1
+    sampled_rows = rows[::step]
+    sampled_columns = matrix.columns()[::step]
+    lost_point = _lost_point_bits_level1(sampled_rows, full) + _lost_point_bits_level1(sampled_columns, full)
+    lost_point += sum((_lost_point_bits_level2(rows[row:row + 2], full) for row in range(0, matrix.size - 1, step)))
+    lost_point += _lost_point_bits_level3(sampled_rows, full) + _lost_point_bits_level3(sampled_columns, full)
+    return lost_point * step + _lost_point_bits_level4(rows, matrix.size)
+
+def _lost_point_bits_level1(lines, full):
+    lost_point = 0
+    for line in lines:
+        for bits in (line, line ^ full):
+            runs = bits & bits >> 1 & bits >> 2 & bits >> 3 & bits >> 4
+            if runs:
+                lost_point += runs.bit_count() + 2 * (runs & ~(runs >> 1)).bit_count()
+    return lost_point
+
+def _lost_point_bits_level2(rows, full):
+    blocks = 0
+    inner = full >> 1
+    for this_row, next_row in zip(rows, rows[1:]):
+        same = ~(this_row ^ next_row)
+        blocks += (same & same >> 1 & ~(this_row ^ this_row >> 1) & inner).bit_count()
+    return blocks * 3
+
+def _lost_point_bits_level3(lines, full):
+    patterns = 0
+    for dark in lines:
+        light = dark ^ full
+        common = light << 1 & dark << 4 & light << 5 & dark << 6 & light << 9
+        if common:
+            patterns += (common & dark & dark << 2 & dark << 3 & light << 7 & light << 8 & light << 10).bit_count()
+            patterns += (common & light & light << 2 & light << 3 & dark << 7 & dark << 8 & dark << 10).bit_count()
+    return patterns * 40
+
+def _lost_point_bits_level4(rows, modules_count):
+    dark_count = sum((bits.bit_count() for bits in rows))
+    percent = float(dark_count) / modules_count ** 2
+    rating = int(abs(percent * 100 - 50) / 5)
+    return rating * 10
+
 def optimal_data_chunks(data, minimum=4):
     """
     An iterator returning QRData chunks optimized to the data content.
@@ -760,27 +1229,77 @@ def optimal_data_chunks(data, minimum=4):
         re_repeat = b'{' + str(minimum).encode('ascii') + b',}'
         num_pattern = re.compile(num_pattern + re_repeat)
         alpha_pattern = re.compile(alpha_pattern + re_repeat)
-    num_bits = _optimal_split(data, num_pattern)
-    for is_num, chunk in num_bits:
+    for is_num, start, end in _optimal_spans(data, num_pattern, 0, len(data)):
         if is_num:
-            yield QRData(chunk, mode=MODE_NUMBER, check_data=False)
+            yield QRData(data[start:end], mode=MODE_NUMBER, check_data=False)
         else:
-            for is_alpha, sub_chunk in _optimal_split(chunk, alpha_pattern):
+            for is_alpha, sub_start, sub_end in _optimal_spans(data, alpha_pattern, start, end):
                 mode = MODE_ALPHA_NUM if is_alpha else MODE_8BIT_BYTE
-                yield QRData(sub_chunk, mode=mode, check_data=False)
-
-def _optimal_split(data, pattern):
-    while data:
-        match = re.search(pattern, data)
-        if not match:
-            break
-        start, end = (match.start(), match.end())
-        if start:
-            yield (False, data[:start])
-        yield (True, data[start:end])
-        data = data[end:]
-    if data:
-        yield (False, data)
+                yield QRData(data[sub_start:sub_end], mode=mode, check_data=False)
+
+def _optimal_spans(data, pattern, pos, endpos):
+    """
+    Yield ``(is_match, start, end)`` spans covering ``data[pos:endpos]``.
+
+    The data is scanned once with ``finditer`` bounded by ``pos`` and
+    ``endpos``, so nothing is copied until the caller slices the spans.
+    """
+    for match in pattern.finditer(data, pos, endpos):
+        start, end = match.span()
+        if start > pos:
+            yield (False, pos, start)
+        yield (True, start, end)
+        pos = end
+    if pos < endpos:
+        yield (False, pos, endpos)
+
+def optimal_segments(data, version):
+    """
+    An iterator returning the QRData chunks that encode ``data`` in the
+    fewest bits for ``version``.
+
+    This is a shortest path search over the numeric, alphanumeric and byte
+    modes, run in a single pass over the data. Costs are counted in sixths of
+    a bit so that the 10 bits per 3 digits and 11 bits per 2 alphanumeric
+    characters stay integral.
+    """
+    data = to_bytestring(data)
+    modes = (MODE_NUMBER, MODE_ALPHA_NUM, MODE_8BIT_BYTE)
+    mode_sizes = mode_sizes_for_version(version)
+    head_costs = [(4 + mode_sizes[mode]) * 6 for mode in modes]
+    char_costs = (20, 33, 48)
+    prev_costs = head_costs
+    char_modes = []
+    for char in data:
+        encodable = (48 <= char <= 57, char in ALPHA_NUM, True)
+        cur_costs = [0, 0, 0]
+        came_from: list[int | None] = [None, None, None]
+        for j in range(3):
+            if encodable[j]:
+                cur_costs[j] = prev_costs[j] + char_costs[j]
+                came_from[j] = j
+        for j in range(3):
+            for k in range(3):
+                if came_from[k] is None:
+                    continue
+                new_cost = (cur_costs[k] + 5) // 6 * 6 + head_costs[j]
+                if came_from[j] is None or new_cost < cur_costs[j]:
+                    cur_costs[j] = new_cost
+                    came_from[j] = k
+        char_modes.append(came_from)
+        prev_costs = cur_costs
+    if not data:
+        return
+    current = prev_costs.index(min(prev_costs))
+    path = bytearray(len(data))
+    for i in range(len(data) - 1, -1, -1):
+        current = char_modes[i][current]
+        path[i] = current
+    start = 0
+    for end in range(1, len(data) + 1):
+        if end == len(data) or path[end] != path[start]:
+            yield QRData(data[start:end], mode=modes[path[start]], check_data=False)
+            start = end
 
 def to_bytestring(data):
     """
@@ -828,6 +1347,20 @@ class QRData:
     def __len__(self):
         return len(self.data)
 
+    def bit_length(self, version):
+        """
+        Return the number of bits this data takes once written for ``version``,
+        mode indicator and character count included.
+        """
+        length = len(self.data)
+        if self.mode == MODE_NUMBER:
+            data_bits = length // 3 * 10 + (NUMBER_LENGTH[length % 3] if length % 3 else 0)
+        elif self.mode == MODE_ALPHA_NUM:
+            data_bits = length // 2 * 11 + length % 2 * 6
+        else:
+            data_bits = length * 8
+        return 4 + length_in_bits(self.mode, version) + data_bits
+
     def write(self, buffer):
         if self.mode == MODE_NUMBER:
             for i in range(0, len(self.data), 3):
@@ -842,67 +1375,208 @@ class QRData:
                 else:
                     buffer.put(ALPHA_NUM.find(chars), 6)
         else:
-            data = self.data
-            for c in data:
-                buffer.put(c, 8)
+            buffer.put_bytes(self.data)
 
     def __repr__(self):
         return repr(self.data)
 
 class BitBuffer:
+    """
+    Big-endian bit buffer backed by a ``bytearray``.
+
+    The last byte may be partially filled; its unused low bits are zero.
+    """
 
     def __init__(self):
-        self.buffer: list[int] = []
+        self.buffer = bytearray()
         self.length = 0
 
     def __repr__(self):
         return '.'.join([str(n) for n in self.buffer])
 
     def get(self, index):
-        buf_index = math.floor(index / 8)
-        return self.buffer[buf_index] >> 7 - index % 8 & 1 == 1
+        return self.buffer[index >> 3] >> 7 - (index & 7) & 1 == 1
 
     def put(self, num, length):
-        for i in range(length):
-            self.put_bit(num >> length - i - 1 & 1 == 1)
+        """
+        Append the ``length`` lowest bits of ``num``, most significant first.
+        """
+        if length <= 0:
+            return
+        pending = self.length % 8
+        bits = num & (1 << length) - 1
+        if pending:
+            bits |= self.buffer.pop() >> 8 - pending << length
+        total = pending + length
+        pad = -total % 8
+        self.buffer += (bits << pad).to_bytes((total + pad) // 8, 'big')
+        self.length += length
+
+    def put_bytes(self, data):
+        """
+        Append whole bytes, copied straight in when the buffer is
+        byte-aligned.
+        """
+        if self.length % 8:
+            self.put(int.from_bytes(data, 'big'), len(data) * 8)
+        else:
+            self.buffer += data
+            self.length += len(data) * 8
 
     def __len__(self):
         return self.length
 
     def put_bit(self, bit):
-        buf_index = self.length // 8
-        if len(self.buffer) <= buf_index:
-            self.buffer.append(0)
-        if bit:
-            self.buffer[buf_index] |= 128 >> self.length % 8
-        self.length += 1
+        self.put(1 if bit else 0, 1)
+
+class BitMatrix:
+    """
+    Square matrix of modules stored as one int bitset per row, the first
+    column being the most significant bit (see ``pack_row``).
+
+    ``dark`` holds the module colors and ``reserved`` flags the modules that
+    have been set; modules not reserved yet read as ``None``, like in the
+    list of lists representation.
+    """
+    __slots__ = ('size', 'dark', 'reserved')
+
+    def __init__(self, size, dark=None, reserved=None):
+        self.size = size
+        self.dark = [0] * size if dark is None else dark
+        self.reserved = [0] * size if reserved is None else reserved
+
+    @classmethod
+    def from_list(cls, modules):
+        """
+        Build a matrix from a list of lists of ``None``/``False``/``True``.
+        """
+        dark = [pack_row(row) for row in modules]
+        reserved = [pack_row([cell is not None for cell in row]) for row in modules]
+        return cls(len(modules), dark, reserved)
+
+    def to_list(self):
+        """
+        Return the matrix as a list of lists of ``None``/``False``/``True``.
+        """
+        full = (1 << self.size) - 1
+        modules = []
+        for dark, reserved in zip(self.dark, self.reserved):
+            row: list[bool | None] = list(unpack_row(dark, self.size))
+            if reserved != full:
+                for col, is_set in enumerate(unpack_row(reserved, self.size)):
+                    if not is_set:
+                        row[col] = None
+            modules.append(row)
+        return modules
+
+    def __len__(self):
+        return self.size
+
+    def __eq__(self, other):
+        if not isinstance(other, BitMatrix):
+            return NotImplemented
+        return self.dark == other.dark and self.reserved == other.reserved
+
+    def copy(self):
+        return BitMatrix(self.size, self.dark[:], self.reserved[:])
+
+    def get(self, row, col):
+        shift = self.size - 1 - col
+        if not self.reserved[row] >> shift & 1:
+            return None
+        return self.dark[row] >> shift & 1 == 1
+
+    def set(self, row, col, value):
+        bit = 1 << self.size - 1 - col
+        self.reserved[row] |= bit
+        if value:
+            self.dark[row] |= bit
+        else:
+            self.dark[row] &= ~bit
+
+    def update_rows(self, rows):
+        """
+        Apply a ``util.coords_rows`` bulk update.
+        """
+        for row, area, dark in rows:
+            self.reserved[row] |= area
+            self.dark[row] = self.dark[row] & ~area | dark
+
+    def dark_modules(self):
+        """
+        Yield the ``(row, col)`` coordinates of the dark modules, row by row.
+        """
+        for row, bits in enumerate(self.dark):
+            while bits:
+                top = bits.bit_length() - 1
+                yield (row, self.size - 1 - top)
+                bits ^= 1 << top
+
+    def columns(self):
+        """
+        Return the dark modules column by column, as ints whose most
+        significant bit is the first row.
+        """
+        rows = [format(bits, f'0{self.size}b') for bits in self.dark]
+        return [int(''.join(column), 2) for column in zip(*rows)]
+
+    def to_bytes(self):
+        """
+        Return the dark modules packed with ``pack_rows``. Unset modules are
+        packed as light.
+        """
+        return pack_rows(self.dark, self.size)
+
+    @classmethod
+    def from_bytes(cls, size, data):
+        """
+        Build a fully set matrix of ``size`` modules from ``to_bytes`` output.
+        """
+        return cls(size, unpack_rows(data, size), [(1 << size) - 1] * size)
+
+def rs_generator(ec_count):
+    """
+    Return the generator polynomial coefficients for ``ec_count`` error
+    correction codewords, leading term included.
+
+    Generators are kept in ``rs_generator_cache`` so they are only built once
+    per process (see ``rs_generator_cache.info()`` for hit/miss counters).
+    """
+    generator = rs_generator_cache.get(ec_count)
+    if generator is None:
+        generator = RS_GENERATOR_LUT.get(ec_count) or _build_rs_generator(ec_count)
+        rs_generator_cache.put(ec_count, generator)
+    return generator
+
+def _build_rs_generator(ec_count):
+    generator = bytes([1])
+    for i in range(ec_count):
+        generator = base.gf_xor_rows(generator + bytes(1), bytes(1) + base.gf_mul_row(generator, base.gexp(i)))
+    return generator
+
+def prewarm_rs_generators():
+    """
+    Fill ``rs_generator_cache`` with the generators of every EC codeword
+    count used by a QR Code version.
+    """
+    ec_counts = {block.total_count - block.data_count for version in range(1, 41) for error_correction in base.RS_BLOCK_OFFSET for block in base.rs_blocks(version, error_correction)}
+    for ec_count in sorted(ec_counts):
+        rs_generator(ec_count)
 
 def create_bytes(buffer: BitBuffer, rs_blocks: list[RSBlock]):
     offset = 0
     maxDcCount = 0
     maxEcCount = 0
-    dcdata: list[list[int]] = []
-    ecdata: list[list[int]] = []
+    dcdata: list[bytearray] = []
+    ecdata: list[bytearray] = []
     for rs_block in rs_blocks:
         dcCount = rs_block.data_count
         ecCount = rs_block.total_count - dcCount
         maxDcCount = max(maxDcCount, dcCount)
         maxEcCount = max(maxEcCount, ecCount)
-        current_dc = [255 & buffer.buffer[i + offset] for i in range(dcCount)]
+        current_dc = buffer.buffer[offset:offset + dcCount]
         offset += dcCount
-        if ecCount in LUT.rsPoly_LUT:
-            rsPoly = base.Polynomial(LUT.rsPoly_LUT[ecCount], 0)
-        else:
-            rsPoly = base.Polynomial([1], 0)
-            for i in range(ecCount):
-                rsPoly = rsPoly * base.Polynomial([1, base.gexp(i)], 0)
-        rawPoly = base.Polynomial(current_dc, len(rsPoly) - 1)
-        modPoly = rawPoly % rsPoly
-        current_ec = []
-        mod_offset = len(modPoly) - ecCount
-        for i in range(ecCount):
-            modIndex = i + mod_offset
-            current_ec.append(modPoly[modIndex] if modIndex >= 0 else 0)
+        current_ec = base.rs_encode(current_dc, rs_generator(ecCount))
         dcdata.append(current_dc)
         ecdata.append(current_ec)
     data = []
@@ -926,19 +1600,15 @@ def create_data(version, error_correction, data_list):
     bit_limit = sum((block.data_count * 8 for block in rs_blocks))
     if len(buffer) > bit_limit:
         raise exceptions.DataOverflowError(f'Code length overflow. Data size ({len(buffer)}) > size available ({bit_limit})')
-    for _ in range(min(bit_limit - len(buffer), 4)):
-        buffer.put_bit(False)
+    buffer.put(0, min(bit_limit - len(buffer), 4))
     delimit = len(buffer) % 8
     if delimit:
-        for _ in range(8 - delimit):
-            buffer.put_bit(False)
+        buffer.put(0, 8 - delimit)
     bytes_to_fill = (bit_limit - len(buffer)) // 8
-    for i in range(bytes_to_fill):
-        if i % 2 == 0:
-            buffer.put(PAD0, 8)
-        else:
-            buffer.put(PAD1, 8)
+    buffer.put_bytes((bytes([PAD0, PAD1]) * (bytes_to_fill // 2 + 1))[:bytes_to_fill])
     return create_bytes(buffer, rs_blocks)
+if PREWARM_ON_IMPORT:
+    prewarm_rs_generators()
 
 # Populate namespace for qrcode.util
 qrcode.util.MODE_NUMBER = MODE_NUMBER
@@ -957,13 +1627,36 @@ qrcode.util.G18 = G18
 qrcode.util.G15_MASK = G15_MASK
 qrcode.util.PAD0 = PAD0
 qrcode.util.PAD1 = PAD1
+qrcode.util.PACK_BITS = PACK_BITS
+qrcode.util.UNPACK_BITS = UNPACK_BITS
+qrcode.util.LRUCache = LRUCache
 qrcode.util._data_count = _data_count
 qrcode.util.BIT_LIMIT_TABLE = BIT_LIMIT_TABLE
+qrcode.util.RS_GENERATOR_LUT = RS_GENERATOR_LUT
+qrcode.util.RS_GENERATOR_CACHE_SIZE = RS_GENERATOR_CACHE_SIZE
+qrcode.util.MASK_SAMPLE_STEP = MASK_SAMPLE_STEP
+qrcode.util.PREWARM_ON_IMPORT = PREWARM_ON_IMPORT
+qrcode.util.rs_generator_cache = rs_generator_cache
 qrcode.util.BCH_type_info = BCH_type_info
 qrcode.util.BCH_type_number = BCH_type_number
 qrcode.util.BCH_digit = BCH_digit
+qrcode.util.TYPE_INFO_TABLE = TYPE_INFO_TABLE
+qrcode.util.TYPE_NUMBER_TABLE = TYPE_NUMBER_TABLE
+qrcode.util.type_info_coords = type_info_coords
+qrcode.util.type_number_coords = type_number_coords
+qrcode.util.TYPE_INFO_COORDS = TYPE_INFO_COORDS
+qrcode.util.TYPE_NUMBER_COORDS = TYPE_NUMBER_COORDS
+qrcode.util.type_rows_cache = type_rows_cache
+qrcode.util.coords_rows = coords_rows
+qrcode.util.type_info_rows = type_info_rows
+qrcode.util.type_number_rows = type_number_rows
 qrcode.util.pattern_position = pattern_position
 qrcode.util.mask_func = mask_func
+qrcode.util.mask_rows = mask_rows
+qrcode.util.pack_row = pack_row
+qrcode.util.unpack_row = unpack_row
+qrcode.util.pack_rows = pack_rows
+qrcode.util.unpack_rows = unpack_rows
 qrcode.util.mode_sizes_for_version = mode_sizes_for_version
 qrcode.util.length_in_bits = length_in_bits
 qrcode.util.check_version = check_version
@@ -972,28 +1665,403 @@ qrcode.util._lost_point_level1 = _lost_point_level1
 qrcode.util._lost_point_level2 = _lost_point_level2
 qrcode.util._lost_point_level3 = _lost_point_level3
 qrcode.util._lost_point_level4 = _lost_point_level4
+qrcode.util.lost_point_bits = lost_point_bits
+qrcode.util.lost_point_sampled = lost_point_sampled
+qrcode.util._lost_point_bits_level1 = _lost_point_bits_level1
+qrcode.util._lost_point_bits_level2 = _lost_point_bits_level2
+qrcode.util._lost_point_bits_level3 = _lost_point_bits_level3
+qrcode.util._lost_point_bits_level4 = _lost_point_bits_level4
 qrcode.util.optimal_data_chunks = optimal_data_chunks
-qrcode.util._optimal_split = _optimal_split
+qrcode.util._optimal_spans = _optimal_spans
+qrcode.util.optimal_segments = optimal_segments
 qrcode.util.to_bytestring = to_bytestring
 qrcode.util.optimal_mode = optimal_mode
 qrcode.util.QRData = QRData
 qrcode.util.BitBuffer = BitBuffer
+qrcode.util.BitMatrix = BitMatrix
+qrcode.util.rs_generator = rs_generator
+qrcode.util._build_rs_generator = _build_rs_generator
+qrcode.util.prewarm_rs_generators = prewarm_rs_generators
 qrcode.util.create_bytes = create_bytes
 qrcode.util.create_data = create_data
 
+# ============================================================
+# Module: qrcode.numpy_engine
+# ============================================================
+
+NUMPY_MASK_CACHE_SIZE = 40
+NUMPY_BATCH_SIZE = 16
+np = None
+numpy_mask_cache = util.LRUCache(NUMPY_MASK_CACHE_SIZE)
+# The finder-like patterns 1:1:3:1:1 with four light modules on one side,
+# read as 11 bit numbers, the first module being the most significant bit.
+FINDER_LIKE_PATTERNS = (0b10111010000, 0b00001011101)
+
+def load_numpy():
+    """
+    Import NumPy as ``np`` and return it. NumPy is only imported once a
+    ``QRCode`` uses the numpy engine, keeping it out of ``import qrcode``.
+    """
+    global np
+    if np is None:
+        import numpy as np
+    return np
+
+def to_array(matrix):
+    """
+    Return the dark modules of a ``util.BitMatrix`` as a ``uint8`` array.
+    """
+    size = matrix.size
+    padding = -size % 8
+    width = (size + padding) // 8
+    packed = b''.join((bits << padding).to_bytes(width, 'big') for bits in matrix.dark)
+    rows = np.frombuffer(packed, dtype=np.uint8).reshape(size, width)
+    return np.ascontiguousarray(np.unpackbits(rows, axis=1)[:, :size])
+
+def to_matrix(modules):
+    """
+    Return a fully set ``util.BitMatrix`` from a ``uint8`` array of modules.
+    """
+    size = len(modules)
+    padding = -size % 8
+    packed = np.packbits(modules, axis=1)
+    dark = [int.from_bytes(row.tobytes(), 'big') >> padding for row in packed]
+    return util.BitMatrix(size, dark, [(1 << size) - 1] * size)
+
+def mask_arrays(size, positions):
+    """
+    Return the eight mask patterns as a ``(8, size, size)`` ``uint8`` array
+    restricted to the data modules at the flat indexes ``positions``.
+
+    Arrays are cached per size in ``numpy_mask_cache``.
+    """
+    masks = numpy_mask_cache.get(size)
+    if masks is None:
+        data_area = np.zeros(size * size, dtype=np.uint8)
+        data_area[np.asarray(positions, dtype=np.intp)] = 1
+        i = np.arange(size).reshape(size, 1)
+        j = np.arange(size).reshape(1, size)
+        masks = np.stack([np.broadcast_to(util.mask_func(pattern)(i, j), (size, size)) for pattern in range(8)]).astype(np.uint8)
+        masks &= data_area.reshape(size, size)
+        numpy_mask_cache.put(size, masks)
+    return masks
+
+def map_data(matrix, positions, data):
+    """
+    Scatter the bits of ``data`` over the data modules at the flat indexes
+    ``positions`` of the ``util.BitMatrix`` template, returning a ``uint8``
+    array with the remaining data modules light.
+    """
+    modules = to_array(matrix)
+    bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8))
+    count = min(len(bits), len(positions))
+    flat = modules.reshape(-1)
+    flat[np.asarray(positions[:count], dtype=np.intp)] = bits[:count]
+    return modules
+
+def lost_points(candidates):
+    """
+    Return the ``util.lost_point`` score of each of the ``(n, size, size)``
+    ``uint8`` candidate arrays, as a list of ints.
+    """
+    size = candidates.shape[-1]
+    columns = candidates.transpose(0, 2, 1)
+    scores = _lost_points_level1(candidates) + _lost_points_level1(columns)
+    scores += _lost_points_level2(candidates)
+    scores += _lost_points_level3(candidates) + _lost_points_level3(columns)
+    dark_counts = candidates.sum(axis=(1, 2), dtype=np.int64)
+    return [int(score) + _lost_point_level4_count(dark_count, size) for score, dark_count in zip(scores.tolist(), dark_counts.tolist())]
+
+def _lost_points_level1(lines):
+    same = lines[..., 1:] == lines[..., :-1]
+    # True on each window of five same colored modules: a run of length
+    # n >= 5 holds n - 4 windows, add 2 per run for n - 2.
+    windows = same[..., :-3] & same[..., 1:-2] & same[..., 2:-1] & same[..., 3:]
+    runs = windows[..., 0].sum(axis=-1) + (windows[..., 1:] & ~windows[..., :-1]).sum(axis=(-2, -1))
+    return windows.sum(axis=(-2, -1)) + 2 * runs
+
+def _lost_points_level2(candidates):
+    top_left = candidates[:, :-1, :-1]
+    blocks = (top_left == candidates[:, :-1, 1:]) & (top_left == candidates[:, 1:, :-1]) & (top_left == candidates[:, 1:, 1:])
+    return 3 * blocks.sum(axis=(1, 2))
+
+def _lost_points_level3(lines):
+    span = lines.shape[-1] - 10
+    windows = np.zeros(lines.shape[:-1] + (span,), dtype=np.uint16)
+    for offset in range(11):
+        windows <<= 1
+        windows |= lines[..., offset:offset + span]
+    matches = (windows == FINDER_LIKE_PATTERNS[0]) | (windows == FINDER_LIKE_PATTERNS[1])
+    return 40 * matches.sum(axis=(-2, -1))
+
+def _lost_point_level4_count(dark_count, modules_count):
+    percent = float(dark_count) / modules_count ** 2
+    rating = int(abs(percent * 100 - 50) / 5)
+    return rating * 10
+
+def mask_scores(candidates, masks):
+    """
+    Return the eight mask penalties of each of the ``uint8`` arrays of
+    unmasked modules in ``candidates``.
+
+    Candidates are scored ``NUMPY_BATCH_SIZE`` at a time, all masks at once.
+    """
+    scores = []
+    for start in range(0, len(candidates), NUMPY_BATCH_SIZE):
+        batch = np.stack(candidates[start:start + NUMPY_BATCH_SIZE])
+        batch_scores = lost_points((batch[:, np.newaxis] ^ masks).reshape(-1, *masks.shape[1:]))
+        scores += [batch_scores[offset:offset + 8] for offset in range(0, len(batch_scores), 8)]
+    return scores
+
+# Populate namespace for qrcode.numpy_engine
+qrcode.numpy_engine.NUMPY_MASK_CACHE_SIZE = NUMPY_MASK_CACHE_SIZE
+qrcode.numpy_engine.NUMPY_BATCH_SIZE = NUMPY_BATCH_SIZE
+qrcode.numpy_engine.numpy_mask_cache = numpy_mask_cache
+qrcode.numpy_engine.FINDER_LIKE_PATTERNS = FINDER_LIKE_PATTERNS
+qrcode.numpy_engine.load_numpy = load_numpy
+qrcode.numpy_engine.to_array = to_array
+qrcode.numpy_engine.to_matrix = to_matrix
+qrcode.numpy_engine.mask_arrays = mask_arrays
+qrcode.numpy_engine.map_data = map_data
+qrcode.numpy_engine.lost_points = lost_points
+qrcode.numpy_engine._lost_points_level1 = _lost_points_level1
+qrcode.numpy_engine._lost_points_level2 = _lost_points_level2
+qrcode.numpy_engine._lost_points_level3 = _lost_points_level3
+qrcode.numpy_engine._lost_point_level4_count = _lost_point_level4_count
+qrcode.numpy_engine.mask_scores = mask_scores
+
 # ============================================================
 # Module: qrcode.main
 # Original: python-qrcode/qrcode/main.py
 # ============================================================
 
 ModulesType = list[list[Optional[bool]]]
-precomputed_qr_blanks: dict[int, ModulesType] = {}
+precomputed_qr_blanks: dict[int, util.BitMatrix] = {}
+precomputed_type_areas: dict[int, list[int]] = {}
+precomputed_data_positions: dict[int, array] = {}
+precomputed_data_gathers: dict[int, tuple[itemgetter, ...]] = {}
+MASK_GRID_CACHE_SIZE = 40
+mask_grid_cache = util.LRUCache(MASK_GRID_CACHE_SIZE)
+MATRIX_CACHE_SIZE = 128
+MASK_STRATEGIES = ('full', 'first_acceptable', 'sampled')
+MASK_THRESHOLD = 0.8
+TEMPLATES_MAGIC = b'QRTPL\x01'
+TEMPLATES_PATH = os.environ.get('QRCODE_TEMPLATES')
+matrix_cache = util.LRUCache(MATRIX_CACHE_SIZE)
+
+def default_image_factory():
+    """
+    Return the image factory used when none is given: ``PilImage`` if PIL is
+    installed, else ``PyPNGImage`` if PyPNG is, else ``PurePNGImage``.
+    """
+    if Image:
+        return PilImage
+    return PyPNGImage if PngWriter else PurePNGImage
 
 def make(data=None, **kwargs):
     qr = QRCode(**kwargs)
     qr.add_data(data)
     return qr.make_image()
 
+def make_batch(payloads, **kwargs):
+    """
+    Build the module matrix of each payload, yielding ``util.BitMatrix``
+    objects in the payloads order. See ``QRCode.make_many``.
+    """
+    return QRCode.make_many(payloads, **kwargs)
+
+def make_bytes(data=None, cache=None, optimize=20, kind=None, **kwargs):
+    """
+    Like ``make``, but return the image saved as bytes, served from
+    ``cache`` (a ``ResultCache``) when possible.
+    """
+    qr = QRCode(**kwargs)
+    qr.add_data(data, optimize=optimize)
+    return qr.make_image_bytes(cache=cache, kind=kind)
+
+def prewarm_templates():
+    """
+    Build the template, type information area and data module placement of
+    every version.
+    """
+    qr = QRCode()
+    for version in range(1, 41):
+        qr.version = version
+        qr.setup_template(True, 0)
+
+def dump_templates():
+    """
+    Return the templates of every version in the binary form read by
+    ``load_templates``: ``TEMPLATES_MAGIC`` then, for each version in order,
+    the dark modules, set modules and type information area of its template
+    packed with ``util.pack_rows``.
+    """
+    prewarm_templates()
+    chunks = [TEMPLATES_MAGIC]
+    for version in range(1, 41):
+        size = version * 4 + 17
+        blank = precomputed_qr_blanks[version]
+        chunks += [util.pack_rows(blank.dark, size), util.pack_rows(blank.reserved, size), util.pack_rows(precomputed_type_areas[version], size)]
+    return b''.join(chunks)
+
+def save_templates(path):
+    """
+    Write ``dump_templates()`` to the file at ``path``.
+    """
+    Path(path).write_bytes(dump_templates())
+
+def load_templates(source):
+    """
+    Load the templates of every version from ``dump_templates()`` output,
+    given as a path or a bytes-like object such as an ``mmap``.
+
+    Nothing is replaced if the data is invalid. Otherwise the caches derived
+    from the templates (data module placements, mask grids and finished
+    matrices) are cleared.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source = Path(source).read_bytes()
+    data = memoryview(source)
+    if bytes(data[:len(TEMPLATES_MAGIC)]) != TEMPLATES_MAGIC:
+        raise ValueError('Invalid templates data (bad magic)')
+    offset = len(TEMPLATES_MAGIC)
+    blanks = {}
+    type_areas = {}
+    for version in range(1, 41):
+        size = version * 4 + 17
+        length = size * ((size + 7) // 8)
+        if len(data) < offset + 3 * length:
+            raise ValueError('Invalid templates data (truncated)')
+        dark, reserved, type_area = (util.unpack_rows(data[start:start + length], size) for start in range(offset, offset + 3 * length, length))
+        blanks[version] = util.BitMatrix(size, dark, reserved)
+        type_areas[version] = type_area
+        offset += 3 * length
+    precomputed_qr_blanks.update(blanks)
+    precomputed_type_areas.update(type_areas)
+    precomputed_data_positions.clear()
+    precomputed_data_gathers.clear()
+    mask_grid_cache.clear()
+    matrix_cache.clear()
+
+class AsyncRunner:
+    """
+    Run blocking calls from coroutines in ``executor``, the event loop
+    default executor if ``None``, with at most ``max_concurrency`` calls at
+    once per event loop if set. ``max_concurrency`` can be changed at any
+    time; calls already waiting keep the previous limit.
+
+    Cancelling the awaiting task cancels a call still waiting for a slot
+    or a worker; a call already running completes in the background.
+    """
+
+    def __init__(self, executor=None, max_concurrency=None):
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @property
+    def uses_processes(self):
+        """
+        Whether calls run in a process pool, their arguments and results
+        being pickled.
+        """
+        return isinstance(self.executor, ProcessPoolExecutor)
+
+    async def run(self, func, *args, **kwargs):
+        return await self._run(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def run_in_thread(self, func, *args, **kwargs):
+        """
+        Like ``run``, but in the event loop default executor when
+        ``executor`` is a process pool, for calls whose arguments cannot be
+        pickled.
+        """
+        executor = None if self.uses_processes else self.executor
+        return await self._run(executor, functools.partial(func, *args, **kwargs))
+
+    async def _run(self, executor, call):
+        loop = asyncio.get_running_loop()
+        if self.max_concurrency is None:
+            return await loop.run_in_executor(executor, call)
+        semaphores = self._semaphores.get(loop)
+        if semaphores is None:
+            semaphores = self._semaphores[loop] = {}
+        semaphore = semaphores.get(self.max_concurrency)
+        if semaphore is None:
+            semaphore = semaphores[self.max_concurrency] = asyncio.Semaphore(self.max_concurrency)
+        async with semaphore:
+            return await loop.run_in_executor(executor, call)
+
+class StreamWriterIO(io.RawIOBase):
+    """
+    Blocking file-like wrapper of an ``asyncio.StreamWriter``, to be written
+    to from a worker thread: each write is forwarded to the event loop and
+    waits for the writer to drain.
+    """
+
+    def __init__(self, writer, loop):
+        super().__init__()
+        self.writer = writer
+        self.loop = loop
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('I/O operation on closed stream.')
+        data = bytes(data)
+        asyncio.run_coroutine_threadsafe(self._write(data), self.loop).result()
+        return len(data)
+
+    async def _write(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+async_runner = AsyncRunner()
+
+def configure_async(executor=None, max_concurrency=None):
+    """
+    Set the executor and concurrency limit used by the async API when no
+    ``runner`` is given.
+    """
+    async_runner.executor = executor
+    async_runner.max_concurrency = max_concurrency
+
+async def amake(data=None, runner=None, **kwargs):
+    """
+    Async counterpart of ``make``, building the image in ``runner`` (an
+    ``AsyncRunner``, see ``configure_async`` for the default one).
+
+    With a process pool, see ``QRCode.amake_image``.
+    """
+    runner = runner or async_runner
+    if not runner.uses_processes:
+        return await runner.run(make, data, **kwargs)
+    qr = QRCode(**kwargs)
+    qr.add_data(data)
+    return await qr.amake_image(runner=runner)
+
+def _make_state(qr):
+    """
+    Process pool side of ``QRCode.amake_image``: make ``qr`` and return its
+    picklable ``made_state``.
+    """
+    qr.make()
+    return qr.made_state()
+
+async def asave(image, writer, runner=None, **kwargs):
+    """
+    Stream ``image.save()`` into the ``asyncio.StreamWriter`` ``writer``,
+    the image being saved in a thread of ``runner`` (see
+    ``AsyncRunner.run_in_thread``), as the stream is bound to the event loop.
+    """
+    stream = StreamWriterIO(writer, asyncio.get_running_loop())
+    try:
+        await (runner or async_runner).run_in_thread(image.save, stream, **kwargs)
+    finally:
+        stream.close()
+    await writer.drain()
+
 def _check_box_size(size):
     if int(size) <= 0:
         raise ValueError(f'Invalid box size (was {size}, expected larger than 0)')
@@ -1010,8 +2078,26 @@ def _check_mask_pattern(mask_pattern):
     if mask_pattern < 0 or mask_pattern > 7:
         raise ValueError(f'Mask pattern should be in range(8) (got {mask_pattern})')
 
-def copy_2d_array(x):
-    return [row[:] for row in x]
+def _check_engine(engine):
+    """
+    Return the engine to use for ``engine``, resolving ``'auto'`` to
+    ``'numpy'`` when NumPy is importable and to ``'python'`` otherwise.
+
+    NumPy is imported here the first time the numpy engine is chosen.
+    """
+    if engine == 'auto':
+        engine = 'numpy' if constants.NUMPY_AVAILABLE else 'python'
+    if engine not in ('python', 'numpy'):
+        raise ValueError(f"Invalid engine (was {engine!r}, expected 'python', 'numpy' or 'auto')")
+    if engine == 'numpy':
+        if not constants.NUMPY_AVAILABLE:
+            raise ImportError("The 'numpy' engine requires NumPy to be installed")
+        numpy_engine.load_numpy()
+    return engine
+
+def _check_mask_strategy(mask_strategy):
+    if mask_strategy not in MASK_STRATEGIES:
+        raise ValueError(f"Invalid mask strategy (was {mask_strategy!r}, expected one of {', '.join(MASK_STRATEGIES)})")
 
 class ActiveWithNeighbors(NamedTuple):
     NW: bool
@@ -1030,17 +2116,22 @@ GenericImage = TypeVar('GenericImage', bound=BaseImage)
 GenericImageLocal = TypeVar('GenericImageLocal', bound=BaseImage)
 
 class QRCode(Generic[GenericImage]):
-    modules: ModulesType
+    _matrix: util.BitMatrix | None
+    _modules: ModulesType | None
     _version: int | None = None
 
-    def __init__(self, version=None, error_correction=constants.ERROR_CORRECT_M, box_size=10, border=4, image_factory: type[GenericImage] | None=None, mask_pattern=None):
+    def __init__(self, version=None, error_correction=constants.ERROR_CORRECT_M, box_size=10, border=4, image_factory: type[GenericImage] | None=None, mask_pattern=None, engine='python', mask_strategy='full', mask_threshold=MASK_THRESHOLD):
         _check_box_size(box_size)
         _check_border(border)
+        _check_mask_strategy(mask_strategy)
         self.version = version
         self.error_correction = int(error_correction)
         self.box_size = int(box_size)
         self.border = int(border)
         self.mask_pattern = mask_pattern
+        self.mask_strategy = mask_strategy
+        self.mask_threshold = mask_threshold
+        self.engine = _check_engine(engine)
         self.image_factory = image_factory
         if image_factory is not None:
             assert issubclass(image_factory, BaseImage)
@@ -1076,6 +2167,43 @@ class QRCode(Generic[GenericImage]):
         self.modules_count = 0
         self.data_cache = None
         self.data_list = []
+        self.chosen_mask_pattern = None
+        self.chosen_mask_strategy = None
+        self.mask_scores = None
+
+    @property
+    def matrix(self) -> util.BitMatrix:
+        """
+        The modules as a ``util.BitMatrix``, the representation used to build
+        and score the QR Code.
+        """
+        if self._matrix is None:
+            self._matrix = util.BitMatrix.from_list(self._modules)
+        return self._matrix
+
+    @matrix.setter
+    def matrix(self, value):
+        self._matrix = value
+        self._modules = None
+
+    @property
+    def modules(self) -> ModulesType:
+        """
+        The modules as a list of lists, built from ``matrix`` on first access.
+
+        Once handed out, the list is the reference: ``matrix`` is rebuilt from
+        it on its next access, so that in-place edits are drawn by every
+        image factory. Reading ``matrix`` alone never builds the list.
+        """
+        if self._modules is None:
+            self._modules = self._matrix.to_list()
+        self._matrix = None
+        return self._modules
+
+    @modules.setter
+    def modules(self, value):
+        self._modules = value
+        self._matrix = None
 
     def add_data(self, data, optimize=20):
         """
@@ -1083,48 +2211,220 @@ class QRCode(Generic[GenericImage]):
 
         :param optimize: Data will be split into multiple chunks to optimize
             the QR size by finding to more compressed modes of at least this
-            length. Set to ``0`` to avoid optimizing at all.
+            length. Set to ``0`` to avoid optimizing at all, or to ``'optimal'``
+            to use the segmentation taking the fewest bits.
         """
         if isinstance(data, util.QRData):
             self.data_list.append(data)
+        elif optimize == 'optimal':
+            self.data_list.extend(self.optimal_segments(data))
         elif optimize:
             self.data_list.extend(util.optimal_data_chunks(data, minimum=optimize))
         else:
             self.data_list.append(util.QRData(data))
         self.data_cache = None
 
+    def optimal_segments(self, data):
+        """
+        Return the minimum-bit segmentation of ``data``.
+
+        The character count indicator sizes depend on the version, so unless a
+        version was set, each range of versions sharing the same sizes is tried
+        in turn and the first segmentation fitting in its own range is kept.
+        """
+        if self._version is not None:
+            return list(util.optimal_segments(data, self._version))
+        chunks: list[util.QRData] = []
+        for start, end in ((1, 9), (10, 26), (27, 40)):
+            chunks = list(util.optimal_segments(data, start))
+            needed_bits = sum((chunk.bit_length(start) for chunk in chain(self.data_list, chunks)))
+            if bisect_left(util.BIT_LIMIT_TABLE[self.error_correction], needed_bits, start) <= end:
+                break
+        return chunks
+
     def make(self, fit=True):
         """
         Compile the data into a QR Code array.
 
+        Finished matrices are memoized in ``matrix_cache`` by class,
+        ``data_key``, error correction, version, ``fit`` and mask settings.
+
         :param fit: If ``True`` (or if a size has not been provided), find the
             best fit for the data to avoid data overflow errors.
         """
+        key = (type(self), self.data_key(), self.error_correction, self._version, bool(fit), self.mask_pattern, self.mask_strategy, self.mask_threshold)
+        cached = matrix_cache.get(key)
+        if cached is not None:
+            self.load_made_state(cached)
+            return
         if fit or self.version is None:
             self.best_fit(start=self.version)
         if self.mask_pattern is None:
-            self.makeImpl(False, self.best_mask_pattern())
+            self.chosen_mask_pattern = self.best_mask_pattern()
+            self.chosen_mask_strategy = self.mask_strategy
         else:
-            self.makeImpl(False, self.mask_pattern)
+            self.chosen_mask_pattern = self.mask_pattern
+            self.chosen_mask_strategy = 'fixed'
+        self.makeImpl(False, self.chosen_mask_pattern)
+        matrix_cache.put(key, self.made_state())
+
+    def made_state(self):
+        """
+        Return what ``make`` computed: the version, the chosen mask pattern and
+        strategy, the mask scores, a copy of the matrix and the codewords.
+        """
+        return (self.version, self.chosen_mask_pattern, self.chosen_mask_strategy, self.mask_scores, self.matrix.copy(), self.data_cache)
+
+    def load_made_state(self, state):
+        """
+        Restore the ``made_state`` of an equivalent QR Code instead of making
+        this one.
+        """
+        self.version, self.chosen_mask_pattern, self.chosen_mask_strategy, self.mask_scores, matrix, self.data_cache = state
+        self.modules_count = matrix.size
+        self.matrix = matrix.copy()
+
+    def data_key(self):
+        """
+        Return the data segments as a hashable tuple of ``(mode, data)``.
+        """
+        return tuple(((data.mode, bytes(data.data)) for data in self.data_list))
 
     def makeImpl(self, test, mask_pattern):
+        self.setup_template(test, mask_pattern)
+        if self.data_cache is None:
+            self.data_cache = util.create_data(self.version, self.error_correction, self.data_list)
+        self.map_data(self.data_cache, mask_pattern)
+
+    @classmethod
+    def make_many(cls, payloads, fit=True, optimize=20, chunk_size=256, **kwargs):
+        """
+        Build the module matrix of each payload, yielding ``util.BitMatrix``
+        objects in the payloads order.
+
+        All payloads share the settings passed as ``kwargs`` to ``QRCode``:
+        ``version`` and ``fit`` behave as in ``make``, ``mask_pattern`` fixes the
+        mask or lets each code use its best one. Payloads are read
+        ``chunk_size`` at a time and the codes of a chunk are built grouped by
+        version, sharing templates and mask grids.
+        """
+        qr = cls(**kwargs)
+        payloads = iter(payloads)
+        while True:
+            chunk = list(islice(payloads, chunk_size))
+            if not chunk:
+                return
+            yield from qr.make_chunk(chunk, fit, optimize)
+
+    def make_chunk(self, payloads, fit=True, optimize=20):
+        """
+        Return the module matrices of ``payloads``, see ``make_many``.
+        """
+        version = self._version
+        groups: dict[int, list[tuple[int, bytearray]]] = {}
+        for index, payload in enumerate(payloads):
+            self.clear()
+            self.version = version
+            self.add_data(payload, optimize=optimize)
+            if fit or self.version is None:
+                self.best_fit(start=self.version)
+            data = util.create_data(self.version, self.error_correction, self.data_list)
+            groups.setdefault(self.version, []).append((index, data))
+        matrices: list[util.BitMatrix | None] = [None] * len(payloads)
+        for group_version, items in groups.items():
+            self.version = group_version
+            if self.mask_pattern is None:
+                self.setup_template(True, 0)
+                patterns = self.best_mask_patterns([data for _, data in items])
+            else:
+                patterns = [self.mask_pattern] * len(items)
+            templates: dict[int, util.BitMatrix] = {}
+            for (index, data), pattern in zip(items, patterns):
+                if pattern not in templates:
+                    self.setup_template(False, pattern)
+                    templates[pattern] = self.matrix
+                self.matrix = templates[pattern]
+                self.map_data(data, pattern)
+                matrices[index] = self.matrix
+        self.clear()
+        self.version = version
+        return matrices
+
+    @classmethod
+    def from_matrix(cls, matrix, **kwargs):
+        """
+        Build a QR Code ready to render from a finished matrix, a
+        ``util.BitMatrix`` (as yielded by ``make_batch``) or a list of lists of
+        bools, without encoding anything.
+
+        The version comes from the matrix size and the error correction and
+        chosen mask pattern from its format information, overriding ``kwargs``
+        passed to ``QRCode``. The data is not known:
+        ``data_list`` is empty and ``data_cache`` is empty bytes.
+        """
+        if not isinstance(matrix, util.BitMatrix):
+            matrix = util.BitMatrix.from_list(matrix)
+        version, remainder = divmod(matrix.size - 17, 4)
+        if remainder:
+            raise ValueError(f'Invalid matrix size (was {matrix.size}, expected 4 * version + 17)')
+        qr = cls(**dict(kwargs, version=version))
+        qr.modules_count = matrix.size
+        qr.matrix = matrix.copy()
+        bits = 0
+        for i in range(15):
+            if i < 6:
+                row = i
+            elif i < 8:
+                row = i + 1
+            else:
+                row = matrix.size - 15 + i
+            bits |= bool(matrix.get(row, 8)) << i
+        data = (bits ^ util.G15_MASK) >> 10
+        if util.BCH_type_info(data) != bits:
+            raise ValueError('Invalid matrix format information')
+        qr.error_correction = data >> 3
+        qr.chosen_mask_pattern = data & 7
+        qr.data_cache = b''
+        return qr
+
+    def setup_template(self, test, mask_pattern):
+        """
+        Reset the modules to the function patterns and type information,
+        leaving the data modules unset.
+        """
         self.modules_count = self.version * 4 + 17
-        if self.version in precomputed_qr_blanks:
-            self.modules = copy_2d_array(precomputed_qr_blanks[self.version])
-        else:
+        self.matrix = self.blank_template().copy()
+        self.setup_type_info(test, mask_pattern)
+        if self.version >= 7:
+            self.setup_type_number(test)
+        if self.version not in precomputed_data_positions:
+            precomputed_data_positions[self.version] = self.find_data_positions()
+
+    def blank_template(self):
+        """
+        Return the function patterns of this version, without type information.
+
+        Templates are built on first use, along with the area of the type
+        information, see ``prewarm_templates`` and ``load_templates`` to get
+        them ahead of time.
+        """
+        blank = precomputed_qr_blanks.get(self.version)
+        if blank is None:
+            self.modules_count = self.version * 4 + 17
             self.modules = [[None] * self.modules_count for i in range(self.modules_count)]
             self.setup_position_probe_pattern(0, 0)
             self.setup_position_probe_pattern(self.modules_count - 7, 0)
             self.setup_position_probe_pattern(0, self.modules_count - 7)
             self.setup_position_adjust_pattern()
             self.setup_timing_pattern()
-            precomputed_qr_blanks[self.version] = copy_2d_array(self.modules)
-        self.setup_type_info(test, mask_pattern)
-        if self.version >= 7:
-            self.setup_type_number(test)
-        if self.data_cache is None:
-            self.data_cache = util.create_data(self.version, self.error_correction, self.data_list)
-        self.map_data(self.data_cache, mask_pattern)
+            blank = util.BitMatrix.from_list(self.modules)
+            self.matrix = blank.copy()
+            self.setup_type_info(True, 0)
+            if self.version >= 7:
+                self.setup_type_number(True)
+            precomputed_type_areas[self.version] = [reserved ^ blank_reserved for reserved, blank_reserved in zip(self.matrix.reserved, blank.reserved)]
+            precomputed_qr_blanks[self.version] = blank
+        return blank
 
     def setup_position_probe_pattern(self, row, col):
         for r in range(-1, 8):
@@ -1145,17 +2445,11 @@ class QRCode(Generic[GenericImage]):
         if start is None:
             start = 1
         util.check_version(start)
-        mode_sizes = util.mode_sizes_for_version(start)
-        buffer = util.BitBuffer()
-        for data in self.data_list:
-            buffer.put(data.mode, 4)
-            buffer.put(len(data), mode_sizes[data.mode])
-            data.write(buffer)
-        needed_bits = len(buffer)
+        needed_bits = sum((data.bit_length(start) for data in self.data_list))
         self.version = bisect_left(util.BIT_LIMIT_TABLE[self.error_correction], needed_bits, start)
         if self.version == 41:
             raise exceptions.DataOverflowError
-        if mode_sizes is not util.mode_sizes_for_version(self.version):
+        if util.mode_sizes_for_version(start) is not util.mode_sizes_for_version(self.version):
             self.best_fit(start=self.version)
         return self.version
 
@@ -1163,15 +2457,73 @@ class QRCode(Generic[GenericImage]):
         """
         Find the most efficient mask pattern.
         """
-        min_lost_point = 0
-        pattern = 0
-        for i in range(8):
-            self.makeImpl(True, i)
-            lost_point = util.lost_point(self.modules)
-            if i == 0 or min_lost_point > lost_point:
-                min_lost_point = lost_point
-                pattern = i
-        return pattern
+        self.setup_template(True, 0)
+        if self.data_cache is None:
+            self.data_cache = util.create_data(self.version, self.error_correction, self.data_list)
+        return self.best_mask_patterns([self.data_cache])[0]
+
+    def best_mask_patterns(self, codewords):
+        """
+        Find the most efficient mask pattern for each of the ``codewords``,
+        all of the current version, with the test template in ``matrix``.
+
+        Function patterns are the same whatever the mask, so the data is mapped
+        once without mask and each pattern is applied to it as a row-wise XOR
+        with its precomputed grid before scoring. See ``choose_mask`` for the
+        mask strategies.
+        """
+        template = self.matrix
+        if self.engine == 'numpy' and self.mask_strategy != 'sampled':
+            masks = numpy_engine.mask_arrays(self.modules_count, self.data_positions())
+            candidates = [numpy_engine.map_data(template, self.data_positions(), data) for data in codewords]
+            return [self.choose_mask(scores) for scores in numpy_engine.mask_scores(candidates, masks)]
+        score = util.lost_point_sampled if self.mask_strategy == 'sampled' else util.lost_point
+        grids = self.mask_grids()
+        patterns = []
+        for data in codewords:
+            self.matrix = template
+            self.map_data(data, None)
+            unmasked = self.matrix
+            scores = (score(util.BitMatrix(unmasked.size, [bits ^ mask for bits, mask in zip(unmasked.dark, grid)], unmasked.reserved)) for grid in grids)
+            patterns.append(self.choose_mask(scores))
+        return patterns
+
+    def choose_mask(self, scores):
+        """
+        Return the first mask pattern with the lowest of the penalty ``scores``
+        (an iterable in mask pattern order), recording the evaluated ones in
+        ``mask_scores``.
+
+        With the ``'first_acceptable'`` strategy, scores stop being consumed at
+        the first penalty per module not above ``mask_threshold``.
+        """
+        threshold = self.mask_threshold * self.modules_count ** 2
+        evaluated = []
+        for lost_point in scores:
+            evaluated.append(lost_point)
+            if self.mask_strategy == 'first_acceptable' and lost_point <= threshold:
+                break
+        self.mask_scores = evaluated
+        return evaluated.index(min(evaluated))
+
+    def mask_grids(self):
+        """
+        Return the eight mask patterns of this version as packed rows covering
+        only the data modules.
+
+        Grids are cached per version in ``mask_grid_cache``; use
+        ``mask_grid_cache.resize()`` to change how many versions are kept.
+        """
+        grids = mask_grid_cache.get(self.version)
+        if grids is None:
+            size = self.modules_count
+            data_rows = [0] * size
+            for index in self.data_positions():
+                row, col = divmod(index, size)
+                data_rows[row] |= 1 << size - 1 - col
+            grids = tuple((tuple((mask & data for mask, data in zip(util.mask_rows(pattern, size), data_rows))) for pattern in range(8)))
+            mask_grid_cache.put(self.version, grids)
+        return grids
 
     def print_tty(self, out=None):
         """
@@ -1263,19 +2615,81 @@ class QRCode(Generic[GenericImage]):
         else:
             image_factory = self.image_factory
             if image_factory is None:
-                image_factory = PilImage if Image else PyPNGImage
-        im = image_factory(self.border, self.modules_count, self.box_size, qrcode_modules=self.modules, **kwargs)
+                image_factory = default_image_factory()
+        matrix = self.matrix
+        im = image_factory(self.border, self.modules_count, self.box_size, qrcode_modules=self._modules, qrcode_matrix=matrix, **kwargs)
         if im.needs_drawrect:
-            for r in range(self.modules_count):
-                for c in range(self.modules_count):
-                    if im.needs_context:
+            if im.needs_context:
+                for r in range(self.modules_count):
+                    for c in range(self.modules_count):
                         im.drawrect_context(r, c, qr=self)
-                    elif self.modules[r][c]:
-                        im.drawrect(r, c)
+            elif not im.drawmatrix(matrix):
+                for r, c in matrix.dark_modules():
+                    im.drawrect(r, c)
         if im.needs_processing:
             im.process()
         return im
 
+    def make_image_bytes(self, image_factory=None, cache=None, kind=None, **kwargs):
+        """
+        Make the image and return it saved as bytes, of ``kind`` if given.
+
+        With a ``cache`` (a ``ResultCache``), the bytes are looked up first by
+        ``cache_key`` and stored after rendering. Images whose ``kwargs`` have
+        no ``cache_key`` are rendered without the cache.
+        """
+        key = None
+        if cache is not None:
+            key = self.cache_key(image_factory, kind, kwargs)
+        if key is not None:
+            value = cache.get(key)
+            if value is not None:
+                return value
+        stream = io.BytesIO()
+        image = self.make_image(image_factory, **kwargs)
+        if kind is None:
+            image.save(stream)
+        else:
+            image.save(stream, kind=kind)
+        value = stream.getvalue()
+        if key is not None:
+            cache.put(key, value)
+        return value
+
+    def cache_key(self, image_factory=None, kind=None, kwargs=None):
+        """
+        Return the ``ResultCache`` key of the image ``make_image_bytes`` would
+        render: a digest of the data segments, the QR Code settings, the image
+        factory, ``kind`` and the render ``kwargs``.
+
+        Return ``None`` if a render keyword argument is not a plain value (see
+        ``is_cache_value``), such as a module drawer or a color mask.
+        """
+        kwargs = sorted((kwargs or {}).items())
+        if not is_cache_value(kwargs):
+            return None
+        if image_factory is None:
+            image_factory = self.image_factory or default_image_factory()
+        settings = (self._version, self.error_correction, self.mask_pattern, self.mask_strategy, self.mask_threshold, self.box_size, self.border)
+        factory = f'{image_factory.__module__}.{image_factory.__qualname__}'
+        return ResultCache.key('image', self.data_key(), settings, factory, kind, kwargs)
+
+    async def amake_image(self, image_factory=None, runner=None, **kwargs):
+        """
+        Async counterpart of ``make_image``, run in ``runner`` (an
+        ``AsyncRunner``, see ``configure_async`` for the default one).
+
+        Images may not be picklable (``PilImage`` is not), so with a process
+        pool only the encoding runs in a worker process; the image is drawn
+        in a thread.
+        """
+        runner = runner or async_runner
+        if not runner.uses_processes:
+            return await runner.run(self.make_image, image_factory, **kwargs)
+        if self.data_cache is None:
+            self.load_made_state(await runner.run(_make_state, self))
+        return await runner.run_in_thread(self.make_image, image_factory, **kwargs)
+
     def is_constrained(self, row: int, col: int) -> bool:
         return row >= 0 and row < len(self.modules) and (col >= 0) and (col < len(self.modules[row]))
 
@@ -1305,64 +2719,85 @@ class QRCode(Generic[GenericImage]):
                             self.modules[row + r][col + c] = False
 
     def setup_type_number(self, test):
-        bits = util.BCH_type_number(self.version)
-        for i in range(18):
-            mod = not test and bits >> i & 1 == 1
-            self.modules[i // 3][i % 3 + self.modules_count - 8 - 3] = mod
-        for i in range(18):
-            mod = not test and bits >> i & 1 == 1
-            self.modules[i % 3 + self.modules_count - 8 - 3][i // 3] = mod
+        bits = 0 if test else util.TYPE_NUMBER_TABLE[self.version]
+        self.matrix.update_rows(util.type_number_rows(self.modules_count, bits))
 
     def setup_type_info(self, test, mask_pattern):
-        data = self.error_correction << 3 | mask_pattern
-        bits = util.BCH_type_info(data)
-        for i in range(15):
-            mod = not test and bits >> i & 1 == 1
-            if i < 6:
-                self.modules[i][8] = mod
-            elif i < 8:
-                self.modules[i + 1][8] = mod
-            else:
-                self.modules[self.modules_count - 15 + i][8] = mod
-        for i in range(15):
-            mod = not test and bits >> i & 1 == 1
-            if i < 8:
-                self.modules[8][self.modules_count - i - 1] = mod
-            elif i < 9:
-                self.modules[8][15 - i - 1 + 1] = mod
-            else:
-                self.modules[8][15 - i - 1] = mod
-        self.modules[self.modules_count - 8][8] = not test
+        bits = 0 if test else util.TYPE_INFO_TABLE[self.error_correction << 3 | mask_pattern] | 1 << 15
+        self.matrix.update_rows(util.type_info_rows(self.modules_count, bits))
 
     def map_data(self, data, mask_pattern):
+        """
+        Write the data bits into the data modules, applying ``mask_pattern``
+        unless it is ``None``.
+        """
+        matrix = self.matrix
+        if self.engine == 'numpy':
+            modules = numpy_engine.map_data(matrix, self.data_positions(), data)
+            if mask_pattern is not None:
+                modules ^= numpy_engine.mask_arrays(self.modules_count, self.data_positions())[mask_pattern]
+            self.matrix = numpy_engine.to_matrix(modules)
+            return
+        bits = format(int.from_bytes(data, 'big'), f'0{len(data) * 8}b') if data else ''
+        bits = bits.ljust(len(self.data_positions()) + 1, '0')
+        data_rows = [int(''.join(gather(bits)), 2) for gather in self.data_gathers()]
+        if mask_pattern is not None:
+            data_rows = [row ^ mask for row, mask in zip(data_rows, self.mask_grids()[mask_pattern])]
+        dark = [row | data_row for row, data_row in zip(matrix.dark, data_rows)]
+        self.matrix = util.BitMatrix(matrix.size, dark, [(1 << matrix.size) - 1] * matrix.size)
+
+    def data_positions(self):
+        """
+        Return the data modules of this version in placement order, as flat
+        ``row * modules_count + col`` indexes.
+
+        The order is computed once per version by ``setup_template``.
+        """
+        return precomputed_data_positions[self.version]
+
+    def data_gathers(self):
+        """
+        Return one ``itemgetter`` per row picking, from the data bit string
+        padded with a trailing ``'0'``, the bit of each module of the row.
+        Modules outside of the data area pick the trailing ``'0'``.
+
+        The getters are built once per version from ``data_positions``.
+        """
+        gathers = precomputed_data_gathers.get(self.version)
+        if gathers is None:
+            size = self.modules_count
+            positions = self.data_positions()
+            sources = [len(positions)] * (size * size)
+            for bit_index, index in enumerate(positions):
+                sources[index] = bit_index
+            gathers = tuple((itemgetter(*sources[row * size:(row + 1) * size]) for row in range(size)))
+            precomputed_data_gathers[self.version] = gathers
+        return gathers
+
+    def find_data_positions(self):
+        """
+        Walk the template of this version up and down column pairs, starting
+        from the bottom right corner, and return the flat indexes of the
+        modules outside of the function patterns and type information.
+        """
+        positions = array('H')
+        reserved = [blank | area for blank, area in zip(self.blank_template().reserved, precomputed_type_areas[self.version])]
         inc = -1
         row = self.modules_count - 1
-        bitIndex = 7
-        byteIndex = 0
-        mask_func = util.mask_func(mask_pattern)
-        data_len = len(data)
         for col in range(self.modules_count - 1, 0, -2):
             if col <= 6:
                 col -= 1
             col_range = (col, col - 1)
             while True:
                 for c in col_range:
-                    if self.modules[row][c] is None:
-                        dark = False
-                        if byteIndex < data_len:
-                            dark = data[byteIndex] >> bitIndex & 1 == 1
-                        if mask_func(row, c):
-                            dark = not dark
-                        self.modules[row][c] = dark
-                        bitIndex -= 1
-                        if bitIndex == -1:
-                            byteIndex += 1
-                            bitIndex = 7
+                    if not reserved[row] >> self.modules_count - 1 - c & 1:
+                        positions.append(row * self.modules_count + c)
                 row += inc
                 if row < 0 or self.modules_count <= row:
                     row -= inc
                     inc = -inc
                     break
+        return positions
 
     def get_matrix(self):
         """
@@ -1389,24 +2824,352 @@ class QRCode(Generic[GenericImage]):
                 context.append(self.is_constrained(r, c) and bool(self.modules[r][c]))
         return ActiveWithNeighbors(*context)
 
+if TEMPLATES_PATH:
+    try:
+        load_templates(TEMPLATES_PATH)
+    except (OSError, ValueError) as error:
+        warnings.warn(f'Cannot load the templates from QRCODE_TEMPLATES ({error}), they will be computed on first use.', RuntimeWarning)
+elif util.PREWARM_ON_IMPORT:
+    prewarm_templates()
+
 # Populate namespace for qrcode.main
 qrcode.main.ModulesType = ModulesType
+qrcode.main.MASK_GRID_CACHE_SIZE = MASK_GRID_CACHE_SIZE
+qrcode.main.mask_grid_cache = mask_grid_cache
+qrcode.main.MATRIX_CACHE_SIZE = MATRIX_CACHE_SIZE
+qrcode.main.MASK_STRATEGIES = MASK_STRATEGIES
+qrcode.main.MASK_THRESHOLD = MASK_THRESHOLD
+qrcode.main.matrix_cache = matrix_cache
+qrcode.main.TEMPLATES_MAGIC = TEMPLATES_MAGIC
+qrcode.main.TEMPLATES_PATH = TEMPLATES_PATH
+qrcode.main.default_image_factory = default_image_factory
 qrcode.main.make = make
+qrcode.main.make_batch = make_batch
+qrcode.main.make_bytes = make_bytes
+qrcode.main.prewarm_templates = prewarm_templates
+qrcode.main.dump_templates = dump_templates
+qrcode.main.save_templates = save_templates
+qrcode.main.load_templates = load_templates
+qrcode.main.AsyncRunner = AsyncRunner
+qrcode.main.StreamWriterIO = StreamWriterIO
+qrcode.main.async_runner = async_runner
+qrcode.main.configure_async = configure_async
+qrcode.main.amake = amake
+qrcode.main._make_state = _make_state
+qrcode.main.asave = asave
 qrcode.main._check_box_size = _check_box_size
 qrcode.main._check_border = _check_border
 qrcode.main._check_mask_pattern = _check_mask_pattern
-qrcode.main.copy_2d_array = copy_2d_array
+qrcode.main._check_engine = _check_engine
+qrcode.main._check_mask_strategy = _check_mask_strategy
 qrcode.main.ActiveWithNeighbors = ActiveWithNeighbors
 qrcode.main.GenericImage = GenericImage
 qrcode.main.GenericImageLocal = GenericImageLocal
 qrcode.main.QRCode = QRCode
 
+# ============================================================
+# Module: qrcode.cache
+# ============================================================
+
+RESULT_CACHE_SIZE = 256
+DISK_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_KEY_TYPES = (str, bytes, int, float, bool, type(None))
+
+def is_cache_value(value):
+    """
+    Return whether ``value`` can be part of a ``ResultCache`` key: a str,
+    bytes, int, float, bool or None, or a tuple or list of those. Other
+    objects may be keyed by their memory address in their ``repr``.
+    """
+    if type(value) in (tuple, list):
+        return all((is_cache_value(item) for item in value))
+    return type(value) in CACHE_KEY_TYPES
+
+class SqliteCacheStore:
+    """
+    On-disk cache tier keeping the entries in a sqlite database, evicting
+    the least recently used ones once they exceed ``max_bytes``.
+    """
+
+    def __init__(self, path, max_bytes=DISK_CACHE_MAX_BYTES):
+        if sqlite3 is None:
+            raise ImportError('sqlite3 is not available.')
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+            return bytes(row[0])
+
+    def put(self, key, value):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', (key, value, len(value), time.time()))
+            self._trim()
+
+    def size(self):
+        """
+        Return the total size of the stored entries, in bytes.
+        """
+        with self._lock:
+            return self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM entries')
+            self.evictions = 0
+
+    def close(self):
+        self._db.close()
+
+    def _trim(self):
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        while total > self.max_bytes:
+            key, size = self._db.execute('SELECT key, size FROM entries ORDER BY used LIMIT 1').fetchone()
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= size
+            self.evictions += 1
+
+class DirectoryCacheStore:
+    """
+    On-disk cache tier keeping one file per entry in ``path``, evicting the
+    least recently used ones (by modification time) once they exceed
+    ``max_bytes``.
+    """
+
+    def __init__(self, path, max_bytes=DISK_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._bytes: int | None = None
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        path = self.path / key
+        try:
+            value = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def put(self, key, value):
+        path = self.path / key
+        temporary = path.with_name(f'{key}.{os.getpid()}.{threading.get_ident()}.tmp')
+        temporary.write_bytes(value)
+        os.replace(temporary, path)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self.size()
+            else:
+                self._bytes += len(value)
+            if self._bytes > self.max_bytes:
+                self._trim()
+
+    def size(self):
+        """
+        Return the total size of the stored entries, in bytes.
+        """
+        return sum((stat.st_size for _, stat in self._entries()))
+
+    def clear(self):
+        with self._lock:
+            for path, _ in self._entries():
+                path.unlink(missing_ok=True)
+            self._bytes = 0
+            self.evictions = 0
+
+    def close(self):
+        pass
+
+    def _entries(self):
+        entries = []
+        for path in self.path.iterdir():
+            if path.suffix == '.tmp':
+                continue
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def _trim(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum((stat.st_size for _, stat in entries))
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            self.evictions += 1
+        self._bytes = total
+
+class ResultCache:
+    """
+    Content-addressed cache of rendered QR Codes, see
+    ``QRCode.make_image_bytes``.
+
+    Entries live in an in-memory LRU tier of ``maxsize`` entries backed, if
+    given, by an on-disk ``store`` (``SqliteCacheStore`` or
+    ``DirectoryCacheStore``). Entries found on disk are promoted to memory.
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE, store=None):
+        self.memory = util.LRUCache(maxsize)
+        self.store = store
+        self.store_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts):
+        """
+        Return the key of the entry identified by ``parts``, which must be
+        values accepted by ``is_cache_value``.
+        """
+        if not is_cache_value(parts):
+            raise TypeError('Cache key parts must be str, bytes, int, float, bool, None or tuples of those.')
+        return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                self.store_hits += 1
+                self.memory.put(key, value)
+        if value is None:
+            self.misses += 1
+        return value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.store is not None:
+            self.store.put(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        self.store_hits = self.misses = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def info(self):
+        memory = self.memory.info()
+        info = {'hits': memory['hits'] + self.store_hits, 'misses': self.misses, 'memory_hits': memory['hits'], 'store_hits': self.store_hits, 'evictions': memory['evictions'], 'size': memory['size'], 'maxsize': memory['maxsize']}
+        if self.store is not None:
+            info['store_evictions'] = self.store.evictions
+            info['store_bytes'] = self.store.size()
+        return info
+
+# Populate namespace for qrcode.cache
+qrcode.cache.RESULT_CACHE_SIZE = RESULT_CACHE_SIZE
+qrcode.cache.DISK_CACHE_MAX_BYTES = DISK_CACHE_MAX_BYTES
+qrcode.cache.CACHE_KEY_TYPES = CACHE_KEY_TYPES
+qrcode.cache.is_cache_value = is_cache_value
+qrcode.cache.SqliteCacheStore = SqliteCacheStore
+qrcode.cache.DirectoryCacheStore = DirectoryCacheStore
+qrcode.cache.ResultCache = ResultCache
+
+# ============================================================
+# Module: qrcode.parallel
+# ============================================================
+
+PARALLEL_CHUNK_SIZE = 64
+
+def make_parallel(payloads, image_factory=None, ordered=True, chunk_size=PARALLEL_CHUNK_SIZE, max_workers=None, executor=None, fit=True, optimize=20, image_kwargs=None, **kwargs):
+    """
+    Build the QR Codes of ``payloads`` in a pool of processes.
+
+    Payloads are submitted ``chunk_size`` at a time, keeping at most two
+    chunks per worker in flight. Without ``image_factory``, workers return
+    the bit-packed matrices and ``util.BitMatrix`` objects are yielded;
+    otherwise workers render each code with ``image_factory`` (and
+    ``image_kwargs``) and the saved image bytes are yielded.
+
+    :param ordered: Yield results in the payloads order. If ``False``,
+        yield ``(index, result)`` pairs as chunks complete.
+    :param executor: An existing ``concurrent.futures`` executor to use
+        instead of a new ``ProcessPoolExecutor`` of ``max_workers``.
+
+    ``fit``, ``optimize`` and other keyword arguments are the ``QRCode``
+    settings shared by all payloads.
+    """
+    if executor is None:
+        with ProcessPoolExecutor(max_workers) as executor:
+            yield from make_parallel(payloads, image_factory, ordered, chunk_size, max_workers, executor, fit, optimize, image_kwargs, **kwargs)
+        return
+    payloads = iter(payloads)
+    in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    options = (image_factory, image_kwargs or {}, fit, optimize, kwargs)
+    pending: deque = deque()
+    start = 0
+
+    def submit():
+        nonlocal start
+        chunk = list(islice(payloads, chunk_size))
+        if not chunk:
+            return False
+        future = executor.submit(_make_parallel_chunk, chunk, *options)
+        pending.append((start, future))
+        start += len(chunk)
+        return True
+    while len(pending) < in_flight and submit():
+        pass
+    while pending:
+        if ordered:
+            _, future = pending.popleft()
+            results = future.result()
+            submit()
+            yield from _decode_parallel_results(results, image_factory)
+            continue
+        wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+        for item in [item for item in pending if item[1].done()]:
+            pending.remove(item)
+            offset, future = item
+            results = future.result()
+            submit()
+            yield from enumerate(_decode_parallel_results(results, image_factory), offset)
+
+def _make_parallel_chunk(payloads, image_factory, image_kwargs, fit, optimize, kwargs):
+    """
+    Worker side of ``make_parallel``: return ``(size, packed bytes)`` per
+    payload, or the saved image bytes when ``image_factory`` is set.
+    """
+    matrices = QRCode(**kwargs).make_chunk(payloads, fit, optimize)
+    if image_factory is None:
+        return [(matrix.size, matrix.to_bytes()) for matrix in matrices]
+    images = []
+    for matrix in matrices:
+        stream = io.BytesIO()
+        QRCode.from_matrix(matrix, image_factory=image_factory, **kwargs).make_image(**image_kwargs).save(stream)
+        images.append(stream.getvalue())
+    return images
+
+def _decode_parallel_results(results, image_factory):
+    if image_factory is not None:
+        return results
+    return [util.BitMatrix.from_bytes(size, data) for size, data in results]
+
+# Populate namespace for qrcode.parallel
+qrcode.parallel.PARALLEL_CHUNK_SIZE = PARALLEL_CHUNK_SIZE
+qrcode.parallel.make_parallel = make_parallel
+qrcode.parallel._make_parallel_chunk = _make_parallel_chunk
+qrcode.parallel._decode_parallel_results = _decode_parallel_results
+
 # ============================================================
 # Module: qrcode
 # Original: python-qrcode/qrcode/__init__.py
 # ============================================================
 
-__all__ = ['ERROR_CORRECT_H', 'ERROR_CORRECT_L', 'ERROR_CORRECT_M', 'ERROR_CORRECT_Q', 'QRCode', 'image', 'make', 'run_example']
+__all__ = ['ERROR_CORRECT_H', 'ERROR_CORRECT_L', 'ERROR_CORRECT_M', 'ERROR_CORRECT_Q', 'QRCode', 'amake', 'asave', 'configure_async', 'image', 'make', 'make_batch', 'make_bytes', 'run_example']
 
 def run_example(data='http://www.lincolnloop.com', *args, **kwargs):
     """
@@ -1431,6 +3194,11 @@ qrcode.ERROR_CORRECT_M = ERROR_CORRECT_M
 qrcode.ERROR_CORRECT_Q = ERROR_CORRECT_Q
 qrcode.QRCode = QRCode
 qrcode.make = make
+qrcode.make_batch = make_batch
+qrcode.make_bytes = make_bytes
+qrcode.amake = amake
+qrcode.asave = asave
+qrcode.configure_async = configure_async
 qrcode.run_example = run_example
 
 # ============================================================
@@ -1447,7 +3215,7 @@ a pipe to a file an image is written. The default image format is PNG.
 if sys.platform.startswith(('win', 'cygwin')):
     import colorama
     colorama.init()
-default_factories = {'pil': 'qrcode.image.pil.PilImage', 'png': 'qrcode.image.pure.PyPNGImage', 'svg': 'qrcode.image.svg.SvgImage', 'svg-fragment': 'qrcode.image.svg.SvgFragmentImage', 'svg-path': 'qrcode.image.svg.SvgPathImage', 'pymaging': 'qrcode.image.pure.PymagingImage'}
+default_factories = {'pil': 'qrcode.image.pil.PilImage', 'png': 'qrcode.image.pure.PyPNGImage', 'purepng': 'qrcode.image.pure.PurePNGImage', 'svg': 'qrcode.image.svg.SvgImage', 'svg-fragment': 'qrcode.image.svg.SvgFragmentImage', 'svg-path': 'qrcode.image.svg.SvgPathImage', 'svg-stream': 'qrcode.image.svg.SvgStreamImage', 'pymaging': 'qrcode.image.pure.PymagingImage'}
 error_correction = {'L': qrcode.ERROR_CORRECT_L, 'M': qrcode.ERROR_CORRECT_M, 'Q': qrcode.ERROR_CORRECT_Q, 'H': qrcode.ERROR_CORRECT_H}
 
 def main(args=None):
@@ -1465,6 +3233,8 @@ def main(args=None):
     parser.add_option('--error-correction', type='choice', choices=sorted(error_correction.keys()), default='M', help='The error correction level to use. Choices are L (7%), M (15%, default), Q (25%), and H (30%).')
     parser.add_option('--ascii', help='Print as ascii even if stdout is piped.', action='store_true')
     parser.add_option('--output', help='The output file. If not specified, the image is sent to the standard output.')
+    parser.add_option('--batch', help='Read one payload per line from stdin (or the file given as argument) and write one image per line, named after the line number, to the --output directory. Codes are built in parallel processes.', action='store_true')
+    parser.add_option('--workers', type=int, help='The number of processes used by --batch. Defaults to the number of CPUs.')
     opts, args = parser.parse_args(args)
     if opts.factory:
         module = default_factories.get(opts.factory, opts.factory)
@@ -1474,6 +3244,16 @@ def main(args=None):
             raise_error(str(e))
     else:
         image_factory = None
+    if opts.batch:
+        if not opts.output:
+            raise_error('--batch requires an --output directory.')
+        optimize = 20 if opts.optimize is None else opts.optimize
+        if args:
+            with Path(args[0]).open('rb') as source:
+                write_batch(source, opts.output, image_factory, opts.workers, optimize=optimize, error_correction=error_correction[opts.error_correction])
+        else:
+            write_batch(sys.stdin.buffer, opts.output, image_factory, opts.workers, optimize=optimize, error_correction=error_correction[opts.error_correction])
+        return
     qr = qrcode.QRCode(error_correction=error_correction[opts.error_correction], image_factory=image_factory)
     if args:
         data = args[0]
@@ -1505,6 +3285,20 @@ def main(args=None):
         sys.stdout.flush()
         img.save(sys.stdout.buffer)
 
+def write_batch(source, output, image_factory=None, workers=None, **kwargs):
+    """
+    Write the image of each line of ``source`` to the ``output`` directory,
+    as ``<line number>.<kind>``, rendering them with ``qrcode.parallel``.
+    """
+    if image_factory is None:
+        image_factory = default_image_factory()
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    suffix = (image_factory.kind or 'png').lower()
+    payloads = (line.rstrip(b'\r\n') for line in source)
+    for index, image in qrcode.parallel.make_parallel(payloads, image_factory, ordered=False, max_workers=workers, **kwargs):
+        (output / f'{index + 1}.{suffix}').write_bytes(image)
+
 def get_factory(module: str) -> type[BaseImage]:
     if '.' not in module:
         raise ValueError('The image factory is not a full python path')
@@ -1538,6 +3332,7 @@ def commas(items: Iterable[str], joiner='or') -> str:
 qrcode.console_scripts.default_factories = default_factories
 qrcode.console_scripts.error_correction = error_correction
 qrcode.console_scripts.main = main
+qrcode.console_scripts.write_batch = write_batch
 qrcode.console_scripts.get_factory = get_factory
 qrcode.console_scripts.get_drawer_help = get_drawer_help
 qrcode.console_scripts.commas = commas
@@ -2369,12 +4164,79 @@ class SvgPathFillImage(SvgPathImage):
     """
     background = 'white'
 
+class SvgStreamImage(qrcode.image.base.BaseImage):
+    """
+    Standalone SVG image builder writing the document straight to the stream
+
+    Builds no element tree: the coordinate strings are computed once per
+    row/column and each row of rects is written as a single string. The
+    output is byte-identical to ``SvgImage`` with its default drawer. With
+    ``runs=True``, each horizontal run of dark modules is written as one
+    wider rect instead.
+    """
+    kind = 'SVG'
+    allowed_kinds = ('SVG',)
+    needs_drawrect = False
+    units = SvgFragmentImage.units
+
+    def new_image(self, **kwargs):
+        self.runs = kwargs.get('runs', False)
+
+    def drawrect(self, row, col):
+        """
+        Not used.
+        """
+
+    def save(self, stream, kind=None):
+        self.check_kind(kind=kind)
+        if isinstance(stream, str):
+            with Path(stream).open('wb') as file:
+                self.save(file)
+            return
+        if isinstance(stream, io.TextIOBase):
+            for chunk in self.chunks_iter():
+                stream.write(chunk)
+        else:
+            for chunk in self.chunks_iter():
+                stream.write(chunk.encode())
+
+    def to_string(self):
+        return ''.join(self.chunks_iter()).encode()
+
+    def chunks_iter(self):
+        """
+        Yield the document as strings: the header, one string per module row
+        holding dark modules, then the footer.
+        """
+        dimension = self.units(self.pixel_size)
+        yield f'''<?xml version='1.0' encoding='UTF-8'?>\n<svg width="{dimension}" height="{dimension}" version="1.1" xmlns="{SvgFragmentImage._SVG_namespace}">'''
+        offsets = [self.units((i + self.border) * self.box_size) for i in range(self.width)]
+        sizes: dict[int, str] = {}
+        pattern = re.compile('1+' if self.runs else '1')
+        unit_size = self.units(self.box_size)
+        for y, bits in zip(offsets, self.matrix.dark):
+            if not bits:
+                continue
+            parts = []
+            for match in pattern.finditer(format(bits, f'0{self.width}b')):
+                length = match.end() - match.start()
+                if length == 1:
+                    width = unit_size
+                else:
+                    width = sizes.get(length)
+                    if width is None:
+                        width = sizes[length] = self.units(length * self.box_size)
+                parts.append(f'<rect x="{offsets[match.start()]}" y="{y}" width="{width}" height="{unit_size}" />')
+            yield ''.join(parts)
+        yield '</svg>'
+
 # Populate namespace for qrcode.image.svg
 qrcode.image.svg.SvgFragmentImage = SvgFragmentImage
 qrcode.image.svg.SvgImage = SvgImage
 qrcode.image.svg.SvgPathImage = SvgPathImage
 qrcode.image.svg.SvgFillImage = SvgFillImage
 qrcode.image.svg.SvgPathFillImage = SvgPathFillImage
+qrcode.image.svg.SvgStreamImage = SvgStreamImage
 
 # ============================================================
 # Module: qrcode.release
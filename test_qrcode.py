@@ -5,10 +5,23 @@ Test qrcode.py against golden masters.
 Copyright (c) 2025 c4ffein
 Licensed under the MIT License - see LICENSE file for details
 """
+import asyncio
+import decimal
+import io
+import os
+import random
+import re
+import socket
+import struct
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import tempfile
+import threading
+import time
+import zlib
 
 # Import the consolidated qrcode module
 import qrcode
@@ -114,9 +127,734 @@ def test_golden_masters():
 
     return all_passed
 
+def reference_ec_codewords(data, ec_count):
+    """Compute error correction codewords with the reference Polynomial path."""
+    rs_poly = qrcode.base.Polynomial(qrcode.LUT.rsPoly_LUT[ec_count], 0)
+    mod_poly = qrcode.base.Polynomial(data, len(rs_poly) - 1) % rs_poly
+    mod_offset = len(mod_poly) - ec_count
+    return [mod_poly[i + mod_offset] if i + mod_offset >= 0 else 0 for i in range(ec_count)]
+
+def test_rs_encoder():
+    """Cross-check the RS encoder against Polynomial for all version/EC combinations."""
+    error_corrections = {
+        'L': qrcode.ERROR_CORRECT_L,
+        'M': qrcode.ERROR_CORRECT_M,
+        'Q': qrcode.ERROR_CORRECT_Q,
+        'H': qrcode.ERROR_CORRECT_H,
+    }
+    rng = random.Random(0)
+    failures = []
+
+    for version in range(1, 41):
+        for name, error_correction in error_corrections.items():
+            for block in qrcode.base.rs_blocks(version, error_correction):
+                ec_count = block.total_count - block.data_count
+                # The reference path can't divide a polynomial with a zero leading term
+                data = [rng.randrange(1, 256)] + [rng.randrange(256) for _ in range(block.data_count - 1)]
+                expected = reference_ec_codewords(data, ec_count)
+                actual = list(qrcode.base.rs_encode(data, qrcode.util.rs_generator(ec_count)))
+                if expected != actual:
+                    failures.append(f'{version}-{name}')
+                    break
+
+    if failures:
+        print(f'❌ rs encoder: FAIL ({", ".join(failures)})')
+        return False
+    print('✅ rs encoder (160 version/EC combinations): PASS')
+    return True
+
+def exhaustive_bit_length(data, version):
+    """Find the fewest bits any segmentation of data takes, by trying all of them."""
+    util = qrcode.util
+    best = [0] + [None] * len(data)
+    for end in range(1, len(data) + 1):
+        for start in range(end):
+            chunk = data[start:end]
+            for mode in (util.MODE_NUMBER, util.MODE_ALPHA_NUM, util.MODE_8BIT_BYTE):
+                if mode < util.optimal_mode(chunk):
+                    continue
+                bits = best[start] + util.QRData(chunk, mode=mode, check_data=False).bit_length(version)
+                if best[end] is None or bits < best[end]:
+                    best[end] = bits
+    return best[-1]
+
+def test_lru_cache():
+    """Check the LRU counters, eviction order and clear() on a known sequence of make() calls, and QRCODE_PREWARM parsing."""
+    cache = qrcode.util.rs_generator_cache
+    cache.clear()
+    cache.resize(2)
+    failures = 0
+    try:
+        # Version 1 codes have one block: 7, 10, 13 and 17 EC codewords for L, M, Q and H.
+        for index, error_correction in enumerate((qrcode.ERROR_CORRECT_M, qrcode.ERROR_CORRECT_M, qrcode.ERROR_CORRECT_L, qrcode.ERROR_CORRECT_M, qrcode.ERROR_CORRECT_Q, qrcode.ERROR_CORRECT_L, qrcode.ERROR_CORRECT_M)):
+            qr = qrcode.QRCode(version=1, error_correction=error_correction)
+            qr.add_data(f'lru-{index}')
+            qr.make(fit=False)
+        if cache.info() != {'hits': 2, 'misses': 5, 'evictions': 3, 'size': 2, 'maxsize': 2}:
+            failures += 1
+        if [ec_count in cache for ec_count in (7, 10, 13)] != [True, True, False]:
+            failures += 1
+        cache.clear()
+        if cache.info() != {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 2}:
+            failures += 1
+    finally:
+        cache.resize(qrcode.util.RS_GENERATOR_CACHE_SIZE)
+
+    code = 'import qrcode; print(qrcode.util.PREWARM_ON_IMPORT, len(qrcode.precomputed_qr_blanks))'
+    for value, expected in (('', 'False 0'), ('0', 'False 0'), ('false', 'False 0'), ('1', 'True 40')):
+        result = subprocess.run([sys.executable, '-c', code], env={**os.environ, 'QRCODE_PREWARM': value}, capture_output=True, text=True)
+        if result.stdout.strip() != expected:
+            failures += 1
+
+    if failures:
+        print(f'❌ lru cache: FAIL ({failures} cases)')
+        return False
+    print('✅ lru cache: PASS')
+    return True
+
+def test_put_bytes():
+    """Check that BitBuffer.put_bytes matches per-byte put(b, 8) and per-bit put_bit calls, aligned or not."""
+    rng = random.Random(0)
+    failures = 0
+
+    for offset in range(17):
+        for length in (0, 1, 2, 7, 64):
+            prefix = rng.getrandbits(offset) if offset else 0
+            data = bytes(rng.randrange(256) for _ in range(length))
+            for chunk in (data, bytearray(data)):
+                fast, slow, bitwise = qrcode.util.BitBuffer(), qrcode.util.BitBuffer(), qrcode.util.BitBuffer()
+                for buffer in (fast, slow, bitwise):
+                    buffer.put(prefix, offset)
+                fast.put_bytes(chunk)
+                for byte in data:
+                    slow.put(byte, 8)
+                    for shift in range(7, -1, -1):
+                        bitwise.put_bit(byte >> shift & 1)
+                if not fast.buffer == slow.buffer == bitwise.buffer or not len(fast) == len(slow) == len(bitwise):
+                    failures += 1
+
+    if failures:
+        print(f'❌ put bytes: FAIL ({failures} cases)')
+        return False
+    print('✅ put bytes: PASS')
+    return True
+
+def test_optimal_segments():
+    """Check the optimal segmentation against an exhaustive search."""
+    rng = random.Random(0)
+    alphabet = b'0123456789' * 3 + b'ABCXYZ $%:' + b'abcxyz'
+    failures = 0
+
+    for _ in range(300):
+        data = bytes(rng.choice(alphabet) for _ in range(rng.randrange(1, 20)))
+        version = rng.choice((1, 10, 27))
+        chunks = list(qrcode.util.optimal_segments(data, version))
+        bits = sum(chunk.bit_length(version) for chunk in chunks)
+        if b''.join(chunk.data for chunk in chunks) != data or bits != exhaustive_bit_length(data, version):
+            failures += 1
+
+    if failures:
+        print(f'❌ optimal segments: FAIL ({failures} cases)')
+        return False
+    print('✅ optimal segments: PASS')
+    return True
+
+def test_bit_matrix():
+    """Check the packed module matrix against its list of lists view."""
+    failures = 0
+
+    for version in (1, 7, 40):
+        qr = qrcode.QRCode(version=version)
+        qr.setup_template(False, 0)
+        template = qr.modules
+        matrix = qrcode.util.BitMatrix.from_list(template)
+        if matrix.to_list() != template or matrix != qr.matrix:
+            failures += 1
+        if any(matrix.get(r, c) is not template[r][c] for r in range(len(template)) for c in range(len(template))):
+            failures += 1
+        dark = [(r, c) for r, row in enumerate(template) for c, module in enumerate(row) if module]
+        if list(matrix.dark_modules()) != dark:
+            failures += 1
+
+    if failures:
+        print(f'❌ bit matrix: FAIL ({failures} cases)')
+        return False
+    print('✅ bit matrix: PASS')
+    return True
+
+def test_lost_point_bits():
+    """Check the bitboard penalty score on every mask of every version."""
+    failures = 0
+
+    for version in range(1, 41):
+        qr = qrcode.QRCode(version=version)
+        qr.add_data('x' * version * 5)
+        qr.make(fit=False)
+        qr.setup_template(True, 0)
+        qr.map_data(qr.data_cache, None)
+        matrix = qr.matrix
+        for grid in qr.mask_grids():
+            masked = qrcode.util.BitMatrix(matrix.size, [bits ^ mask for bits, mask in zip(matrix.dark, grid)], matrix.reserved)
+            if qrcode.util.lost_point_bits(masked) != qrcode.util.lost_point(masked.to_list()):
+                failures += 1
+
+    if failures:
+        print(f'❌ bitboard lost point (320 masks): FAIL ({failures} cases)')
+        return False
+    print('✅ bitboard lost point (320 masks): PASS')
+    return True
+
+def test_numpy_engine():
+    """Check that the NumPy engine builds the same matrices as the default one."""
+    if not qrcode.constants.NUMPY_AVAILABLE:
+        print('⏭️  numpy engine: SKIPPED (NumPy not installed)')
+        return True
+    rng = random.Random(0)
+    failures = 0
+
+    for _ in range(60):
+        data = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 1200)))
+        kwargs = dict(error_correction=rng.choice((0, 1, 2, 3)), mask_pattern=rng.choice((None, None, 2, 7)), mask_strategy=rng.choice(qrcode.MASK_STRATEGIES))
+        qr = qrcode.QRCode(**kwargs)
+        qr.add_data(data)
+        qr.make()
+        qr_numpy = qrcode.QRCode(engine='numpy', **kwargs)
+        qr_numpy.add_data(data)
+        qrcode.matrix_cache.clear()
+        qr_numpy.make()
+        if qr_numpy.modules != qr.modules:
+            failures += 1
+
+    code = 'import sys, qrcode; print("numpy" in sys.modules); qrcode.QRCode(engine="numpy"); print("numpy" in sys.modules)'
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.stdout.split() != ['False', 'True']:
+        failures += 1
+
+    if failures:
+        print(f'❌ numpy engine: FAIL ({failures} cases)')
+        return False
+    print('✅ numpy engine: PASS')
+    return True
+
+def test_make_batch():
+    """Check that make_batch builds the same matrices as one QRCode per payload."""
+    rng = random.Random(0)
+    payloads = [bytes(rng.randrange(256) for _ in range(rng.randrange(1, 300))) for _ in range(40)]
+    failures = 0
+
+    for kwargs in ({}, {'error_correction': qrcode.ERROR_CORRECT_H}, {'mask_pattern': 3}, {'version': 10}):
+        expected = []
+        for data in payloads:
+            qr = qrcode.QRCode(**kwargs)
+            qr.add_data(data)
+            qr.make()
+            expected.append(qr.matrix)
+        if list(qrcode.make_batch(payloads, chunk_size=16, **kwargs)) != expected:
+            failures += 1
+
+    if failures:
+        print(f'❌ make batch: FAIL ({failures} cases)')
+        return False
+    print('✅ make batch: PASS')
+    return True
+
+def test_make_parallel():
+    """Check that make_parallel yields the make_batch matrices, in order or as completed."""
+    rng = random.Random(0)
+    payloads = [bytes(rng.randrange(256) for _ in range(rng.randrange(1, 200))) for _ in range(100)]
+    expected = list(qrcode.make_batch(payloads))
+    failures = 0
+
+    if list(qrcode.parallel.make_parallel(payloads, chunk_size=8, max_workers=2)) != expected:
+        failures += 1
+    completed = dict(qrcode.parallel.make_parallel(payloads, ordered=False, chunk_size=8, max_workers=2))
+    if [completed.get(index) for index in range(len(payloads))] != expected:
+        failures += 1
+
+    if failures:
+        print(f'❌ make parallel: FAIL ({failures} cases)')
+        return False
+    print('✅ make parallel: PASS')
+    return True
+
+def test_async_api():
+    """Check that amake, amake_image and asave give the same images as make and save, in threads and processes."""
+    expected = io.BytesIO()
+    qrcode.make('async', image_factory=qrcode.SvgImage).save(expected)
+
+    async def stream_svg(runner):
+        image = await qrcode.amake('async', image_factory=qrcode.SvgImage, runner=runner)
+        left, right = socket.socketpair()
+        reader, reader_writer = await asyncio.open_connection(sock=right)
+        _, writer = await asyncio.open_connection(sock=left)
+        await qrcode.asave(image, writer, runner=runner)
+        writer.close()
+        await writer.wait_closed()
+        data = await reader.read()
+        reader_writer.close()
+        return data
+
+    async def render(runner, kwargs):
+        qr = qrcode.QRCode(**kwargs)
+        qr.add_data('async')
+        images = [await qrcode.amake('async', runner=runner, **kwargs), await qr.amake_image(runner=runner)]
+        return [saved_bytes(image) for image in images]
+
+    def saved_bytes(image):
+        stream = io.BytesIO()
+        image.save(stream)
+        return stream.getvalue()
+
+    factories = [{}]
+    if qrcode.constants.PIL_AVAILABLE:
+        factories.append({'image_factory': qrcode.PilImage})
+
+    failures = 0
+    with ThreadPoolExecutor(2) as threads, ProcessPoolExecutor(1) as processes:
+        for runner in (qrcode.AsyncRunner(max_concurrency=1), qrcode.AsyncRunner(threads), qrcode.AsyncRunner(processes, max_concurrency=1)):
+            if asyncio.run(stream_svg(runner)) != expected.getvalue():
+                failures += 1
+            for kwargs in factories:
+                if asyncio.run(render(runner, kwargs)) != [saved_bytes(qrcode.make('async', **kwargs))] * 2:
+                    failures += 1
+
+    if failures:
+        print(f'❌ async api: FAIL ({failures} cases)')
+        return False
+    print('✅ async api: PASS')
+    return True
+
+def test_async_concurrency():
+    """Check that changing max_concurrency applies to the next calls on a running loop."""
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def task():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+
+    async def peak(runner, max_concurrency):
+        runner.max_concurrency = max_concurrency
+        running[1] = 0
+        await asyncio.gather(*(runner.run(task) for _ in range(8)))
+        return running[1]
+
+    async def peaks():
+        with ThreadPoolExecutor(8) as threads:
+            runner = qrcode.AsyncRunner(threads)
+            return [await peak(runner, 1), await peak(runner, 4), await peak(runner, 2)]
+
+    result = asyncio.run(peaks())
+    if result != [1, 4, 2]:
+        print(f'❌ async concurrency: FAIL (peaks {result})')
+        return False
+    print('✅ async concurrency: PASS')
+    return True
+
+def test_result_cache():
+    """Check that cached renders match uncached ones, from memory and from disk."""
+    payloads = [f'ticket-{index % 5}' for index in range(20)]
+    expected = [qrcode.make_bytes(data, image_factory=qrcode.SvgImage) for data in payloads]
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stores = [None, qrcode.SqliteCacheStore(Path(tmpdir) / 'cache.db'), qrcode.DirectoryCacheStore(Path(tmpdir) / 'cache')]
+        for store in stores:
+            cache = qrcode.ResultCache(maxsize=2, store=store)
+            if [qrcode.make_bytes(data, cache=cache, image_factory=qrcode.SvgImage) for data in payloads] != expected:
+                failures += 1
+            info = cache.info()
+            if info['hits'] + info['misses'] != len(payloads) or (store is not None and info['store_hits'] != 15):
+                failures += 1
+            if store is not None:
+                store.close()
+
+    if failures:
+        print(f'❌ result cache: FAIL ({failures} cases)')
+        return False
+    print('✅ result cache: PASS')
+    return True
+
+def test_result_cache_drawers():
+    """Check that renders with drawer instances, keyed by address in their repr, bypass the cache."""
+    cache = qrcode.ResultCache()
+    qr = qrcode.QRCode()
+    qr.add_data('https://example.com/')
+    expected = {ratio: qr.make_image_bytes(qrcode.SvgImage, module_drawer=qrcode.SvgSquareDrawer(size_ratio=decimal.Decimal(ratio))) for ratio in ('0.5', '1')}
+    failures = 0
+    for index in range(20):
+        ratio = ('0.5', '1')[index % 2]
+        if qr.make_image_bytes(qrcode.SvgImage, cache=cache, module_drawer=qrcode.SvgSquareDrawer(size_ratio=decimal.Decimal(ratio))) != expected[ratio]:
+            failures += 1
+    info = cache.info()
+    if info['hits'] or info['misses'] or info['size']:
+        failures += 1
+    try:
+        qrcode.ResultCache.key('image', qrcode.SvgSquareDrawer())
+        failures += 1
+    except TypeError:
+        pass
+
+    if failures:
+        print(f'❌ result cache drawers: FAIL ({failures} cases)')
+        return False
+    print('✅ result cache drawers: PASS')
+    return True
+
+def test_matrix_cache_classes():
+    """Check that make() does not serve a subclass the matrices memoized for another class."""
+
+    class FixedMaskQRCode(qrcode.QRCode):
+        def best_mask_pattern(self):
+            return 2
+
+    qr = qrcode.QRCode()
+    qr.add_data('matrix cache')
+    qr.make()
+    fixed = FixedMaskQRCode()
+    fixed.add_data('matrix cache')
+    fixed.make()
+    if qr.chosen_mask_pattern == 2 or fixed.chosen_mask_pattern != 2:
+        print('❌ matrix cache classes: FAIL')
+        return False
+    print('✅ matrix cache classes: PASS')
+    return True
+
+def test_from_matrix():
+    """Check that from_matrix rehydrates the version, EC level, mask and image."""
+    failures = 0
+
+    for error_correction in (qrcode.ERROR_CORRECT_L, qrcode.ERROR_CORRECT_M, qrcode.ERROR_CORRECT_Q, qrcode.ERROR_CORRECT_H):
+        for mask_pattern in (None, 4):
+            qr = qrcode.QRCode(error_correction=error_correction, mask_pattern=mask_pattern, image_factory=qrcode.SvgImage)
+            qr.add_data('https://example.com/tickets/0123456789')
+            qr.make()
+            rehydrated = qrcode.QRCode.from_matrix(qr.matrix, image_factory=qrcode.SvgImage)
+            settings = (rehydrated.version, rehydrated.error_correction, rehydrated.chosen_mask_pattern)
+            if settings != (qr.version, error_correction, qr.chosen_mask_pattern):
+                failures += 1
+            if rehydrated.make_image_bytes() != qr.make_image_bytes():
+                failures += 1
+
+    if failures:
+        print(f'❌ from matrix: FAIL ({failures} cases)')
+        return False
+    print('✅ from matrix: PASS')
+    return True
+
+def test_templates():
+    """Check that saved templates load back identical for all 40 versions."""
+    data = qrcode.dump_templates()
+    blanks = dict(qrcode.precomputed_qr_blanks)
+    type_areas = dict(qrcode.precomputed_type_areas)
+    qrcode.precomputed_qr_blanks.clear()
+    qrcode.precomputed_type_areas.clear()
+    qrcode.load_templates(data)
+
+    failures = 0
+    if qrcode.precomputed_qr_blanks != blanks or qrcode.precomputed_type_areas != type_areas:
+        failures += 1
+
+    qr = qrcode.QRCode()
+    qr.add_data('templates')
+    qr.make()
+    expected = qr.matrix.copy()
+    qrcode.load_templates(data)
+    if qrcode.precomputed_data_positions or qrcode.precomputed_data_gathers or qrcode.mask_grid_cache.info()['size'] or qrcode.matrix_cache.info()['size']:
+        failures += 1
+    qr.make()
+    if qr.matrix != expected:
+        failures += 1
+    try:
+        qrcode.load_templates(data[:-1])
+        failures += 1
+    except ValueError:
+        pass
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        corrupt = Path(tmpdir) / 'corrupt.bin'
+        corrupt.write_bytes(b'not templates')
+        for path in (corrupt, Path(tmpdir) / 'missing.bin'):
+            result = subprocess.run([sys.executable, '-c', 'import qrcode; print(len(qrcode.QRCode().get_matrix()))'], env={**os.environ, 'QRCODE_TEMPLATES': str(path)}, capture_output=True, text=True)
+            if result.returncode != 0 or result.stdout.strip() != '29' or 'QRCODE_TEMPLATES' not in result.stderr:
+                failures += 1
+
+    if failures:
+        print(f'❌ templates: FAIL ({failures} cases)')
+        return False
+    print('✅ templates: PASS')
+    return True
+
+def reference_type_info(modules, size, error_correction, mask_pattern, test):
+    """Write the format information the way the original per-module loops did."""
+    bits = qrcode.util.BCH_type_info(error_correction << 3 | mask_pattern)
+    for i in range(15):
+        mod = not test and bits >> i & 1 == 1
+        if i < 6:
+            modules[i][8] = mod
+        elif i < 8:
+            modules[i + 1][8] = mod
+        else:
+            modules[size - 15 + i][8] = mod
+    for i in range(15):
+        mod = not test and bits >> i & 1 == 1
+        if i < 8:
+            modules[8][size - i - 1] = mod
+        elif i < 9:
+            modules[8][15 - i - 1 + 1] = mod
+        else:
+            modules[8][15 - i - 1] = mod
+    modules[size - 8][8] = not test
+
+def reference_type_number(modules, size, version, test):
+    """Write the version information the way the original per-module loops did."""
+    bits = qrcode.util.BCH_type_number(version)
+    for i in range(18):
+        mod = not test and bits >> i & 1 == 1
+        modules[i // 3][i % 3 + size - 8 - 3] = mod
+    for i in range(18):
+        mod = not test and bits >> i & 1 == 1
+        modules[i % 3 + size - 8 - 3][i // 3] = mod
+
+def test_type_info_tables():
+    """Check the format and version information tables against the original BCH per-module writes."""
+    failures = 0
+
+    for version in range(1, 41):
+        size = version * 4 + 17
+        for error_correction in range(4):
+            for mask_pattern in range(8):
+                for test in (True, False):
+                    qr = qrcode.QRCode(version=version, error_correction=error_correction)
+                    qr.modules_count = size
+                    qr.matrix = qrcode.util.BitMatrix(size)
+                    qr.setup_type_info(test, mask_pattern)
+                    expected = [[None] * size for _ in range(size)]
+                    reference_type_info(expected, size, error_correction, mask_pattern, test)
+                    if qr.matrix.to_list() != expected:
+                        failures += 1
+        if version >= 7:
+            for test in (True, False):
+                qr = qrcode.QRCode(version=version)
+                qr.modules_count = size
+                qr.matrix = qrcode.util.BitMatrix(size)
+                qr.setup_type_number(test)
+                expected = [[None] * size for _ in range(size)]
+                reference_type_number(expected, size, version, test)
+                if qr.matrix.to_list() != expected:
+                    failures += 1
+
+    if failures:
+        print(f'❌ type info tables: FAIL ({failures} cases)')
+        return False
+    print('✅ type info tables: PASS')
+    return True
+
+def test_mask_strategies():
+    """Check the reported mask choices of the full, first acceptable and sampled strategies."""
+    rng = random.Random(0)
+    failures = 0
+
+    for _ in range(20):
+        data = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 1000)))
+        qrs = {}
+        for mask_strategy in qrcode.MASK_STRATEGIES:
+            qr = qrs[mask_strategy] = qrcode.QRCode(mask_strategy=mask_strategy)
+            qr.add_data(data)
+            qr.make()
+            if qr.chosen_mask_strategy != mask_strategy or qr.mask_scores[qr.chosen_mask_pattern] != min(qr.mask_scores):
+                failures += 1
+        full, first = qrs['full'], qrs['first_acceptable']
+        if first.mask_scores != full.mask_scores[:len(first.mask_scores)]:
+            failures += 1
+        if len(first.mask_scores) < 8 and first.mask_scores[-1] > first.mask_threshold * first.modules_count ** 2:
+            failures += 1
+
+    if failures:
+        print(f'❌ mask strategies: FAIL ({failures} cases)')
+        return False
+    print('✅ mask strategies: PASS')
+    return True
+
+def test_pil_fast_path():
+    """Check that PilImage draws the same pixels with and without the whole matrix fast path."""
+    if not qrcode.constants.PIL_AVAILABLE:
+        print('⏭️  pil fast path: SKIPPED (PIL not installed)')
+        return True
+
+    class ModuleByModuleImage(qrcode.PilImage):
+        def drawrect(self, row, col):
+            super().drawrect(row, col)
+
+    failures = 0
+    for colors in ({}, {'fill_color': 'red', 'back_color': 'yellow'}, {'fill_color': (10, 20, 30), 'back_color': 'transparent'}):
+        for box_size, border in ((1, 0), (3, 4), (10, 2)):
+            qr = qrcode.QRCode(box_size=box_size, border=border)
+            qr.add_data('https://example.com/' * 5)
+            fast = qr.make_image(qrcode.PilImage, **colors)
+            slow = qr.make_image(ModuleByModuleImage, **colors)
+            if fast.mode != slow.mode or fast.tobytes() != slow.tobytes():
+                failures += 1
+
+    if failures:
+        print(f'❌ pil fast path: FAIL ({failures} cases)')
+        return False
+    print('✅ pil fast path: PASS')
+    return True
+
+def decode_png_1bit(data):
+    """Decode a 1-bit greyscale PNG into rows of pixel values, dark being True."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    pos, idat, header = 8, b'', None
+    while pos < len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        assert struct.unpack('>I', data[pos + 8 + length:pos + 12 + length])[0] == zlib.crc32(chunk_type + chunk)
+        if chunk_type == b'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif chunk_type == b'IDAT':
+            idat += chunk
+        pos += 12 + length
+    width, height, bit_depth, color_type = header[:4]
+    assert (bit_depth, color_type) == (1, 0)
+    raw = zlib.decompress(idat)
+    stride = (width + 7) // 8 + 1
+    rows = []
+    for y in range(height):
+        line = raw[y * stride:(y + 1) * stride]
+        assert line[0] == 0
+        bits = int.from_bytes(line[1:], 'big') >> (len(line[1:]) * 8 - width)
+        rows.append([not bits >> (width - 1 - x) & 1 for x in range(width)])
+    return rows
+
+def test_pure_png():
+    """Check that PurePNGImage writes a valid 1-bit PNG of the code, scaled and framed by the border, and that rows_iter still yields lists."""
+    failures = 0
+    for data, box_size, border, level in (('hello', 1, 0, 6), ('https://example.com/' * 5, 3, 4, 9), ('x' * 1500, 10, 2, 0)):
+        qr = qrcode.QRCode(box_size=box_size, border=border)
+        qr.add_data(data)
+        stream = io.BytesIO()
+        image = qr.make_image(qrcode.PurePNGImage, compress_level=level)
+        image.save(stream)
+        size = qr.modules_count + border * 2
+        expected = [[False] * size for _ in range(size)]
+        for r, row in enumerate(qr.modules):
+            for c, dark in enumerate(row):
+                expected[r + border][c + border] = dark
+        expected = [[v for v in row for _ in range(box_size)] for row in expected for _ in range(box_size)]
+        if decode_png_1bit(stream.getvalue()) != expected:
+            failures += 1
+        if [[not light for light in row] for row in image.rows_iter()] != expected:
+            failures += 1
+
+    if failures:
+        print(f'❌ pure png: FAIL ({failures} cases)')
+        return False
+    print('✅ pure png: PASS')
+    return True
+
+def test_modules_edits():
+    """Check that in-place edits of modules are drawn by the image factories reading the matrix, which alone never build the lists."""
+    qr = qrcode.QRCode(box_size=1, border=0)
+    qr.add_data('https://example.com/')
+    qr.make()
+    failures = 0
+
+    to_list = qrcode.util.BitMatrix.to_list
+    conversions = []
+
+    def counted_to_list(matrix):
+        conversions.append(matrix)
+        return to_list(matrix)
+
+    qrcode.util.BitMatrix.to_list = counted_to_list
+    try:
+        qr.make_image(qrcode.PurePNGImage).save(io.BytesIO())
+        qr.make_image(qrcode.SvgStreamImage).save(io.BytesIO())
+    finally:
+        qrcode.util.BitMatrix.to_list = to_list
+    if conversions:
+        failures += 1
+
+    row, col = next((r, c) for r in range(qr.modules_count) for c in range(qr.modules_count) if qr.modules[r][c])
+    qr.modules[row][col] = False
+    qr.modules[0][8] = not qr.modules[0][8]
+    expected = [[bool(dark) for dark in line] for line in qr.modules]
+
+    factories = [qrcode.PurePNGImage]
+    if qrcode.PngWriter:
+        factories.append(qrcode.PyPNGImage)
+    for factory in factories:
+        stream = io.BytesIO()
+        qr.make_image(factory).save(stream)
+        if decode_png_1bit(stream.getvalue()) != expected:
+            failures += 1
+    if qrcode.constants.PIL_AVAILABLE:
+        image = qr.make_image(qrcode.PilImage).get_image().convert('1')
+        if [[not image.getpixel((c, r)) for c in range(qr.modules_count)] for r in range(qr.modules_count)] != expected:
+            failures += 1
+    svg, stream_svg = io.BytesIO(), io.BytesIO()
+    qr.make_image(qrcode.SvgImage).save(svg)
+    qr.make_image(qrcode.SvgStreamImage).save(stream_svg)
+    if svg.getvalue() != stream_svg.getvalue():
+        failures += 1
+
+    if failures:
+        print(f'❌ modules edits: FAIL ({failures} cases)')
+        return False
+    print('✅ modules edits: PASS')
+    return True
+
+def test_pypng_packed():
+    """Check that PyPNGImage writes the same PNG from packed and unpacked rows."""
+    if not qrcode.PngWriter:
+        print('⏭️  pypng packed: SKIPPED (PyPNG not installed)')
+        return True
+    failures = 0
+    for box_size, border in ((1, 0), (3, 4), (10, 2)):
+        qr = qrcode.QRCode(box_size=box_size, border=border)
+        qr.add_data('https://example.com/' * 5)
+        packed, unpacked = io.BytesIO(), io.BytesIO()
+        qr.make_image(qrcode.PyPNGImage).save(packed)
+        qr.make_image(qrcode.PyPNGImage, packed=False).save(unpacked)
+        if packed.getvalue() != unpacked.getvalue():
+            failures += 1
+
+    if failures:
+        print(f'❌ pypng packed: FAIL ({failures} cases)')
+        return False
+    print('✅ pypng packed: PASS')
+    return True
+
+def test_svg_stream():
+    """Check that SvgStreamImage writes the same document as SvgImage, to byte and text streams."""
+    failures = 0
+    for data, box_size, border in (('hello', 10, 4), ('https://example.com/' * 5, 7, 2), ('x' * 300, 3, 0)):
+        qr = qrcode.QRCode(box_size=box_size, border=border)
+        qr.add_data(data)
+        expected, binary, text = io.BytesIO(), io.BytesIO(), io.StringIO()
+        qr.make_image(qrcode.SvgImage).save(expected)
+        qr.make_image(qrcode.SvgStreamImage).save(binary)
+        qr.make_image(qrcode.SvgStreamImage).save(text)
+        if not expected.getvalue() == binary.getvalue() == text.getvalue().encode():
+            failures += 1
+        runs = qr.make_image(qrcode.SvgStreamImage, runs=True).to_string()
+        if runs.count(b'<rect') != sum(len(re.findall('1+', ''.join('01'[v] for v in row))) for row in qr.modules):
+            failures += 1
+
+    if failures:
+        print(f'❌ svg stream: FAIL ({failures} cases)')
+        return False
+    print('✅ svg stream: PASS')
+    return True
+
 if __name__ == '__main__':
     if len(sys.argv) > 1 and sys.argv[1] == 'create':
         create_golden_masters()
     else:
-        success = test_golden_masters()
-        sys.exit(0 if success else 1)
+        results = [test_golden_masters(), test_rs_encoder(), test_lru_cache(), test_put_bytes(), test_optimal_segments(), test_bit_matrix(), test_lost_point_bits(), test_numpy_engine(), test_make_batch(), test_make_parallel(), test_async_api(), test_async_concurrency(), test_result_cache(), test_result_cache_drawers(), test_matrix_cache_classes(), test_from_matrix(), test_templates(), test_type_info_tables(), test_mask_strategies(), test_pil_fast_path(), test_pure_png(), test_modules_edits(), test_pypng_packed(), test_svg_stream()]
+        sys.exit(0 if all(results) else 1)